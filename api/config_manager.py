@@ -2,13 +2,18 @@
 Centralized configuration manager for runtime settings.
 """
 import os
-from typing import Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import Annotated, Dict, Any, Optional, Callable
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 import threading
 
+from dotenv import dotenv_values
+
 
 class RuntimeConfig(BaseModel):
     """Runtime configuration model"""
+    # Frozen so snapshots handed out by ConfigManager can be shared without copying
+    model_config = ConfigDict(frozen=True)
+
     SAVE_INTERVAL: int = Field(default=10, ge=1, le=1000, description="Interval for saving progress")
     TEMPERATURE: float = Field(default=0.6, ge=0.0, le=2.0, description="LLM temperature for generation")
     NUM_WORKERS: int = Field(default=4, ge=1, le=32, description="Number of parallel workers")
@@ -19,94 +24,123 @@ class RuntimeConfig(BaseModel):
     ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD: float = Field(default=0.65, ge=0.0, le=1.0, description="Similarity threshold for entity elimination (multi-hop)")
 
 
+# Field metadata resolved once at import instead of on every reload
+_FIELD_NAMES = tuple(RuntimeConfig.model_fields)
+_FIELD_COERCERS: Dict[str, Callable[[str], Any]] = {
+    name: (int if field.annotation is int else float if field.annotation is float else str)
+    for name, field in RuntimeConfig.model_fields.items()
+}
+_DEFAULT_CONFIG = RuntimeConfig()
+_FIELD_DEFAULTS: Dict[str, Any] = _DEFAULT_CONFIG.model_dump()
+_ENV_DEFAULTS: Dict[str, str] = {name: str(value) for name, value in _FIELD_DEFAULTS.items()}
+# Per-field validators so updates only re-check the fields that changed
+_FIELD_ADAPTERS: Dict[str, TypeAdapter] = {
+    name: TypeAdapter(Annotated[field.annotation, field])
+    for name, field in RuntimeConfig.model_fields.items()
+}
+
+
+def _read_env_file(path: str) -> Dict[str, str]:
+    """Read an env file with python-dotenv, keeping only RuntimeConfig fields"""
+    return {
+        key: value
+        for key, value in dotenv_values(path).items()
+        if key in _FIELD_NAMES and value is not None
+    }
+
+
 class ConfigManager:
-    """Thread-safe configuration manager"""
+    """
+    Thread-safe configuration manager.
+
+    Reads are lock-free: writers build a new RuntimeConfig and publish it with a
+    single attribute rebind, which is atomic under the GIL. RuntimeConfig is
+    frozen, so a published snapshot is never mutated afterwards. The write lock
+    only serializes concurrent writers.
+    """
 
     def __init__(self):
-        self._config: RuntimeConfig = RuntimeConfig()
-        self._lock = threading.Lock()
+        self._config: RuntimeConfig = _DEFAULT_CONFIG
+        self._snapshot: RuntimeConfig = self._config
+        self._write_lock = threading.Lock()
         self._load_from_env()
 
+    def _publish(self, new_config: RuntimeConfig):
+        """Publish a new config snapshot (caller must hold _write_lock)"""
+        self._config = new_config
+        self._snapshot = new_config
+
     def _load_from_env(self):
         """Load configuration from environment variables"""
-        with self._lock:
+        with self._write_lock:
             env_values = {}
 
-            # Load each config field from environment
-            for field_name in RuntimeConfig.model_fields.keys():
-                env_value = os.getenv(field_name)
+            # Load each config field from environment, converted to its field type
+            for field_name in _FIELD_NAMES:
+                env_value = os.environ.get(field_name)
                 if env_value is not None:
-                    # Convert to appropriate type
-                    field_info = RuntimeConfig.model_fields[field_name]
-                    if field_info.annotation == int:
-                        env_values[field_name] = int(env_value)
-                    elif field_info.annotation == float:
-                        env_values[field_name] = float(env_value)
-                    else:
-                        env_values[field_name] = env_value
-
-            # Update config with environment values
-            if env_values:
-                self._config = RuntimeConfig(**env_values)
+                    env_values[field_name] = _FIELD_COERCERS[field_name](env_value)
+
+            # Update config with environment values (skip re-validation if nothing changed)
+            if env_values and {**_FIELD_DEFAULTS, **env_values} != dict(self._config):
+                self._publish(RuntimeConfig(**env_values))
 
     def get_config(self) -> RuntimeConfig:
-        """Get current configuration (thread-safe)"""
-        with self._lock:
-            return self._config.model_copy()
+        """Get current configuration (cached frozen snapshot, no copy)"""
+        return self._snapshot
 
     def update_config(self, updates: Dict[str, Any]) -> RuntimeConfig:
         """Update configuration with new values (thread-safe)"""
-        with self._lock:
-            current_dict = self._config.model_dump()
-            current_dict.update(updates)
-            self._config = RuntimeConfig(**current_dict)
+        with self._write_lock:
+            # Validate only the updated fields; unknown keys are ignored as before
+            validated = {
+                key: _FIELD_ADAPTERS[key].validate_python(value)
+                for key, value in updates.items()
+                if key in _FIELD_ADAPTERS
+            }
+            new_config = self._config.model_copy(update=validated)
+            self._publish(new_config)
 
             # Update environment variables so components pick up new values
-            for key, value in updates.items():
-                os.environ[key] = str(value)
+            os.environ.update({key: str(value) for key, value in validated.items()})
 
-            return self._config.model_copy()
+            return new_config
 
     def reload_from_env(self):
         """Reload configuration from environment variables"""
         self._load_from_env()
 
     def reload_from_file(self, env_file: str):
-        """Reload configuration from a specific .env file"""
-        from dotenv import load_dotenv
-        import os
-
-        # Clear existing env vars for config fields
-        with self._lock:
-            for field_name in RuntimeConfig.model_fields.keys():
-                if field_name in os.environ:
-                    del os.environ[field_name]
-
-        # Load from specified file
-        load_dotenv(env_file, override=True)
-
-        # Reload config from newly loaded env vars
-        self._load_from_env()
+        """
+        Reload configuration from a specific .env file (config fields only).
+
+        The file is validated as a whole before anything is published, so a bad
+        value raises without changing the current config or os.environ. Fields
+        missing from the file fall back to their defaults.
+        """
+        file_values = _read_env_file(env_file)
+        new_config = RuntimeConfig(**file_values)
+
+        with self._write_lock:
+            for field_name in _FIELD_NAMES:
+                os.environ.pop(field_name, None)
+            os.environ.update(file_values)
+            if new_config != self._config:
+                self._publish(new_config)
 
     def reset_to_defaults(self):
         """Reset all config fields to their default values from RuntimeConfig model"""
-        with self._lock:
-            # Clear all config-related environment variables
-            for field_name in RuntimeConfig.model_fields.keys():
-                if field_name in os.environ:
-                    del os.environ[field_name]
-
-            # Reset to model defaults
-            self._config = RuntimeConfig()
+        with self._write_lock:
+            # Reset to model defaults (shared frozen instance; skip publishing if already there)
+            if self._config != _DEFAULT_CONFIG:
+                self._publish(_DEFAULT_CONFIG)
 
-            # Update environment variables with defaults
-            for field_name, value in self._config.model_dump().items():
-                os.environ[field_name] = str(value)
+            # Overwrite every config env var with its default (no need to clear first)
+            os.environ.update(_ENV_DEFAULTS)
 
     def get_value(self, key: str) -> Any:
         """Get a specific configuration value"""
-        with self._lock:
-            return getattr(self._config, key, None)
+        return getattr(self._snapshot, key, None)
 
     def set_value(self, key: str, value: Any):
         """Set a specific configuration value"""
@@ -1,11 +1,20 @@
 """
 FastAPI main application entry point.
 """
+from dotenv import load_dotenv
+
+# Load both pipeline environments once, before routers import the pipeline runners.
+# load_dotenv never overrides, so single_hop.env wins for keys both files define.
+load_dotenv('single_hop.env')
+load_dotenv('multi_hop.env')
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.openapi.utils import get_openapi
 from api.routers import single_hop, multi_hop, health, tasks, config
 from api.config_manager import config_manager
+from api.uploads import UploadSizeLimitMiddleware
 
 app = FastAPI(
     title="RAG Testcase Generator",
@@ -16,34 +25,45 @@ app = FastAPI(
 )
 
 
+# Config snapshot the cached OpenAPI example was rendered from
+_openapi_config_snapshot = None
+
+
 def custom_openapi():
     """Customize OpenAPI schema to show current config values in examples"""
-    if app.openapi_schema:
-        return app.openapi_schema
-
-    openapi_schema = get_openapi(
-        title=app.title,
-        version=app.version,
-        description=app.description,
-        routes=app.routes,
-    )
+    global _openapi_config_snapshot
 
-    # Get current config values
+    # Config snapshots are immutable, so identity tells us whether the example is stale
     current_config = config_manager.get_config()
+    if app.openapi_schema and _openapi_config_snapshot is current_config:
+        return app.openapi_schema
+
+    # Route schema is built once; only the config example is refreshed afterwards
+    if not app.openapi_schema:
+        app.openapi_schema = get_openapi(
+            title=app.title,
+            version=app.version,
+            description=app.description,
+            routes=app.routes,
+        )
 
     # Update the PUT /config endpoint schema to show current values as example
-    if "/config/" in openapi_schema["paths"]:
-        put_endpoint = openapi_schema["paths"]["/config/"].get("put")
+    if "/config/" in app.openapi_schema["paths"]:
+        put_endpoint = app.openapi_schema["paths"]["/config/"].get("put")
         if put_endpoint and "requestBody" in put_endpoint:
             # Set example values to current config
             put_endpoint["requestBody"]["content"]["application/json"]["example"] = current_config.model_dump()
 
-    app.openapi_schema = openapi_schema
+    _openapi_config_snapshot = current_config
     return app.openapi_schema
 
 
 app.openapi = custom_openapi
 
+# Reject oversize uploads before their body is read. Added first so it sits
+# inside CORS and a rejected browser upload still gets CORS headers.
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/single-hop/run", "/multi-hop/run"])
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -53,6 +73,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large bodies (results, downloads) for clients that accept gzip.
+# Streamed responses are compressed chunk by chunk; small status polls are
+# left alone. Level 4 trades a little ratio for much less CPU than the default 9.
+app.add_middleware(GZipMiddleware, minimum_size=4096, compresslevel=4)
+
 # Include routers
 app.include_router(health.router, tags=["health"])
 app.include_router(config.router, prefix="/config", tags=["config"])
@@ -71,7 +96,6 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
     import logging
-    from dotenv import load_dotenv
 
     # Configure logging
     logging.basicConfig(
@@ -79,10 +103,7 @@ if __name__ == "__main__":
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     logger = logging.getLogger(__name__)
-
-    # Load environment variables
-    load_dotenv('single_hop.env')
-    logger.info("Environment variables loaded from single_hop.env")
+    logger.info("Environment variables loaded from single_hop.env and multi_hop.env")
 
     # Server configuration
     HOST = "0.0.0.0"
@@ -5,6 +5,7 @@ from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any, Optional
 from enum import Enum
 from datetime import datetime
+from dataclasses import dataclass, field
 
 
 class HealthResponse(BaseModel):
@@ -18,11 +19,6 @@ class SingleHopResponse(BaseModel):
     results: List[Dict[str, Any]]
 
 
-class MultiHopResponse(BaseModel):
-    status: str
-    message: str
-
-
 # Task Management Models
 
 class TaskStatus(str, Enum):
@@ -40,36 +36,53 @@ class TaskType(str, Enum):
     MULTI_HOP = "multi_hop"
 
 
-class StageInfo(BaseModel):
-    """Information about a pipeline stage"""
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+@dataclass(slots=True)
+class StageInfo:
+    """
+    Information about a pipeline stage.
 
+    Internal record kept by TaskManager. It is a plain slotted dataclass rather
+    than a pydantic model because one is created per stage transition, so it
+    skips validation. Responses carry the dict form built by TaskManager, whose
+    shape is StageStatus.
+    """
     name: str
     status: TaskStatus
     progress: float  # 0.0 to 1.0
     items_processed: int
     items_total: int
     tokens_used: int
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
+    # time.monotonic_ns(); converted to datetime in the served form
+    start_time: Optional[int] = field(default=None, repr=False, compare=False)
+    end_time: Optional[int] = field(default=None, repr=False, compare=False)
     error: Optional[str] = None
+    # Dict form served by TaskManager.get_task; cleared whenever a field above changes
+    view_cache: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
 
 
-class TaskInfo(BaseModel):
-    """Complete information about a task"""
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+@dataclass(slots=True)
+class TaskInfo:
+    """
+    Complete information about a task.
 
+    Internal record kept by TaskManager, never returned from an endpoint
+    directly, so like StageInfo it is a slotted dataclass: no validation on
+    construction and no per-instance __dict__.
+    """
     task_id: str
     task_type: TaskType
     status: TaskStatus
     created_at: datetime
+    created_ns: int = 0  # time.monotonic_ns() at created_at, anchor for stage timestamps
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     current_stage: Optional[str] = None
-    stages: Dict[str, StageInfo] = {}
+    stages: Dict[str, StageInfo] = field(default_factory=dict)
+    progress_sum: float = 0.0  # Sum of stages' progress, kept current by TaskManager
     total_prompt_tokens: int = 0
     total_completion_tokens: int = 0
     error: Optional[str] = None
+    version: int = 0  # Bumped by TaskManager on every change; the status endpoint's ETag
 
 
 class TaskSubmitResponse(BaseModel):
@@ -79,6 +92,19 @@ class TaskSubmitResponse(BaseModel):
     message: str
 
 
+class StageStatus(BaseModel):
+    """Information about a pipeline stage, as served by the status endpoint"""
+    name: str
+    status: TaskStatus
+    progress: float  # 0.0 to 1.0
+    items_processed: int
+    items_total: int
+    tokens_used: int
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    error: Optional[str] = None
+
+
 class TaskStatusResponse(BaseModel):
     """Response for task status query"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -87,7 +113,7 @@ class TaskStatusResponse(BaseModel):
     status: TaskStatus
     current_stage: Optional[str] = None
     progress: float  # Overall progress 0.0 to 1.0
-    stages: Dict[str, StageInfo]
+    stages: Dict[str, StageStatus]
     created_at: datetime
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
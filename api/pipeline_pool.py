@@ -0,0 +1,66 @@
+"""
+Bounded dispatch for background pipeline tasks.
+
+Pipelines run on daemon threads, so they share the in-memory task_manager
+(status, results, cancel flags) with the API. They are dominated by
+blocking LLM HTTP calls, which release the GIL while waiting. A process
+pool would need that state to be shared across processes and pickled.
+
+A semaphore limits how many pipelines run at once. Extra submissions wait
+in PENDING status until a slot frees up.
+"""
+import os
+import threading
+from typing import Callable, Optional
+
+from api.models import TaskStatus
+from api.task_manager import task_manager
+from src.utils.logger import info
+
+# Maximum number of pipelines (single-hop and multi-hop combined) running concurrently
+MAX_CONCURRENT_PIPELINES = int(os.getenv("MAX_CONCURRENT_PIPELINES", "2"))
+
+_pipeline_slots = threading.BoundedSemaphore(MAX_CONCURRENT_PIPELINES)
+
+
+def _run_with_slot(target: Callable[[str, Optional[str]], None], task_id: str, pdf_path: Optional[str]):
+    """
+    Wait for a free pipeline slot, then run the pipeline.
+
+    The task may have been deleted or cancelled while it waited; in that case
+    the slot is handed straight back without running anything.
+    """
+    if not _pipeline_slots.acquire(blocking=False):
+        info("Task %s queued: %d pipelines already running", task_id, MAX_CONCURRENT_PIPELINES)
+        _pipeline_slots.acquire()
+    try:
+        if task_manager.get_task_version(task_id) is None:
+            info("Task %s deleted while queued, skipping", task_id)
+            return
+        if task_manager.is_cancelled(task_id):
+            info("Task %s cancelled while queued, skipping", task_id)
+            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
+            return
+        target(task_id, pdf_path)
+    finally:
+        _pipeline_slots.release()
+
+
+def submit_pipeline(target: Callable[[str, Optional[str]], None], task_id: str,
+                    pdf_path: Optional[str] = None, name_prefix: str = "Pipeline"):
+    """
+    Start a pipeline task in the background, subject to the concurrency limit.
+
+    Args:
+        target: Pipeline runner taking (task_id, pdf_path)
+        task_id: UUID of the task to execute
+        pdf_path: Optional path to the uploaded PDF
+        name_prefix: Thread name prefix, for logs and debugging
+    """
+    thread = threading.Thread(
+        target=_run_with_slot,
+        args=(target, task_id, pdf_path),
+        daemon=True,
+        name=f"{name_prefix}-{task_id[:8]}"
+    )
+    thread.start()
@@ -6,21 +6,26 @@ with real-time progress updates.
 """
 import os
 import traceback
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
 from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv('single_hop.env')
 
+from api.config_manager import config_manager
 from api.task_manager import task_manager
-from api.models import TaskStatus, StageInfo
-from src.components.preprocessor import Preprocessor
-from src.components.fact_extractor import FactExtractor
-from src.components.propose_generator import ProposeGenerator
-from src.components.final_answer_generator import FinalAnswerGenerator
-from src.components.answer_evaluator import AnswerEvaluator
-from src.components.extract_questions import QuestionExtractor
-from src.utils.logger import info, error
+from api.models import TaskStatus
+from api.progress import flush_progress
+from src import PROJECT_ROOT
+from src.utils.logger import info, info_event, error
+
+# Output directory for final pipeline results, created once at import
+_RUNS_DIR = os.path.join(PROJECT_ROOT, "runs")
+try:
+    os.makedirs(_RUNS_DIR, exist_ok=True)
+except OSError:
+    pass  # Read-only checkout; save_json will surface the error on first write
+
+# Pipeline components (and their LLM/PDF dependencies) are imported lazily inside
+# run_pipeline_with_tracking so API workers that never run a pipeline don't pay for them.
 
 
 def update_stage_progress(task_id: str, stage_name: str,
@@ -40,18 +45,47 @@ def update_stage_progress(task_id: str, stage_name: str,
         tokens: Tokens used by this stage
         error_msg: Error message if any
     """
-    stage_info = StageInfo(
-        name=stage_name,
-        status=status,
-        progress=progress,
-        items_processed=items_processed,
-        items_total=items_total,
-        tokens_used=tokens,
-        start_time=datetime.now() if status == TaskStatus.RUNNING else None,
-        end_time=datetime.now() if status in [TaskStatus.COMPLETED, TaskStatus.FAILED] else None,
-        error=error_msg
-    )
-    task_manager.update_stage(task_id, stage_name, stage_info)
+    task_manager.patch_stage(task_id, stage_name, status=status, progress=progress,
+                             items_processed=items_processed, items_total=items_total,
+                             tokens_used=tokens, error=error_msg)
+
+
+class _PipelineCancelled(Exception):
+    """Raised when cancellation has been requested, at a stage boundary or mid-stage"""
+
+
+@contextmanager
+def _pipeline_stage(task_id: str, stage_name: str):
+    """
+    Run one pipeline stage: check for cancellation and mark the stage RUNNING
+    in one task_manager call, and mark it FAILED if the body raises. The body
+    reports COMPLETED itself, since only it knows the item and token counts.
+    A component that stops on the task's cancel event raises CancelledError,
+    which marks the stage and task CANCELLED instead.
+
+    Args:
+        task_id: UUID of the task
+        stage_name: Name of the pipeline stage
+
+    Yields:
+        StageCounter: Live item counter the body can pass to its component
+
+    Raises:
+        _PipelineCancelled: If cancellation was requested before or during the stage
+    """
+    if not task_manager.begin_stage(task_id, stage_name):
+        raise _PipelineCancelled(stage_name)
+
+    try:
+        with flush_progress(task_id, stage_name) as counter:
+            yield counter
+    except CancelledError:
+        update_stage_progress(task_id, stage_name, TaskStatus.CANCELLED, 0.0)
+        task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
+        raise _PipelineCancelled(stage_name)
+    except Exception as e:
+        update_stage_progress(task_id, stage_name, TaskStatus.FAILED, 0.0, error_msg=str(e))
+        raise
 
 
 def run_pipeline_with_tracking(task_id: str, pdf_path: str = None):
@@ -76,7 +110,12 @@ def run_pipeline_with_tracking(task_id: str, pdf_path: str = None):
     """
     try:
         task_manager.update_task_status(task_id, TaskStatus.RUNNING)
-        info(f"Starting pipeline execution for task {task_id}")
+        info("Starting pipeline execution for task %s", task_id)
+
+        # Snapshot the runtime config once; PUT /config during the run won't affect this task
+        config = config_manager.get_config()
+        # Set by task_manager.request_cancel; LLM components stop dispatching once it is set
+        cancel_event = task_manager.get_cancel_event(task_id)
 
         total_prompt_tokens = 0
         total_completion_tokens = 0
@@ -85,190 +124,154 @@ def run_pipeline_with_tracking(task_id: str, pdf_path: str = None):
         # Stage 1: Preprocessor - Load and chunk document
         # ========================================================================
 
-        # Check cancellation before starting
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled before starting")
-            return
-
-        update_stage_progress(task_id, "preprocessor", TaskStatus.RUNNING, 0.0)
-
-        # If pdf_path provided, temporarily override environment variable
-        original_pdf_path = None
-        if pdf_path:
-            original_pdf_path = os.getenv("PREPROCESSOR_PDF_PATH")
-            # Convert absolute path to relative path from PROJECT_ROOT
-            from src import PROJECT_ROOT
-            relative_path = os.path.relpath(pdf_path, PROJECT_ROOT)
-            os.environ["PREPROCESSOR_PDF_PATH"] = relative_path
-
-        preprocessor = Preprocessor()
-        preprocessor_result = preprocessor.run()
-
-        # Restore original environment variable if it was overridden
-        if original_pdf_path is not None:
-            os.environ["PREPROCESSOR_PDF_PATH"] = original_pdf_path
-
-        # Preprocessor doesn't support direct mode, must load from file
-        from src.utils.file_utils import load_json
-        preprocessor_output_path = preprocessor.PREPROCESSOR_CHUNKED_OUTPUT_PATH
-        data = load_json(preprocessor_output_path)
-
-        prompt_tokens, completion_tokens, success_num, all_num = preprocessor_result
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        # mark as complete
-        update_stage_progress(task_id, "preprocessor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=len(data), items_total=len(data),
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: Preprocessor completed. Generated {len(data)} chunks.")
+        with _pipeline_stage(task_id, "preprocessor"):
+            from src.utils.file_utils import load_json, save_json, stream_save_json_array
+
+            # If pdf_path provided, temporarily override environment variable
+            original_pdf_path = None
+            if pdf_path:
+                original_pdf_path = os.getenv("PREPROCESSOR_PDF_PATH")
+                # Convert absolute path to relative path from PROJECT_ROOT
+                relative_path = os.path.relpath(pdf_path, PROJECT_ROOT)
+                os.environ["PREPROCESSOR_PDF_PATH"] = relative_path
+
+            from src.components.preprocessor import Preprocessor
+            preprocessor = Preprocessor(config=config)
+            preprocessor_result = preprocessor.run()
+
+            # Restore original environment variable if it was overridden
+            if original_pdf_path is not None:
+                os.environ["PREPROCESSOR_PDF_PATH"] = original_pdf_path
+
+            # Preprocessor doesn't support direct mode; use the chunks it just built,
+            # or load them from file when it reused an earlier run's output
+            data = preprocessor.last_chunk_contents
+            if data is None:
+                data = load_json(preprocessor.last_output_path)
+
+            prompt_tokens, completion_tokens, success_num, all_num = preprocessor_result
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+
+            # mark as complete
+            update_stage_progress(task_id, "preprocessor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=len(data), items_total=len(data),
+                                tokens=prompt_tokens + completion_tokens)
+            info("Task %s: Preprocessor completed. Generated %d chunks.", task_id, len(data))
 
         # ========================================================================
         # Stage 2: FactExtractor - Extract objective facts
         # ========================================================================
 
-        # Check cancellation between stages
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after preprocessor")
-            return
+        with _pipeline_stage(task_id, "fact_extractor") as progress:
+            from src.components.fact_extractor import FactExtractor
+            fact_extractor = FactExtractor(config=config, progress=progress, cancel_event=cancel_event)
 
-        update_stage_progress(task_id, "fact_extractor", TaskStatus.RUNNING, 0.0)
-        fact_extractor = FactExtractor()
+            # Returns: inputs, total_prompt_tokens, total_completion_tokens, total_facts_extracted, success_rate
+            data, prompt_tokens, completion_tokens, total_facts_extracted, success_rate = fact_extractor.run(inputs=data)
 
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, total_facts_extracted, success_rate
-        data, prompt_tokens, completion_tokens, total_facts_extracted, success_rate = fact_extractor.run(inputs=data)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        update_stage_progress(task_id, "fact_extractor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=len(data), items_total=len(data),
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: FactExtractor completed. Extracted {total_facts_extracted} facts (success rate: {success_rate}).")
+            update_stage_progress(task_id, "fact_extractor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=len(data), items_total=len(data),
+                                tokens=prompt_tokens + completion_tokens)
+            info("Task %s: FactExtractor completed. Extracted %s facts (success rate: %s).",
+                 task_id, total_facts_extracted, success_rate)
 
         # ========================================================================
         # Stage 3: ProposeGenerator - Generate proposed questions
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after fact_extractor")
-            return
-
-        update_stage_progress(task_id, "propose_generator", TaskStatus.RUNNING, 0.0)
-        propose_generator = ProposeGenerator()
+        with _pipeline_stage(task_id, "propose_generator") as progress:
+            from src.components.propose_generator import ProposeGenerator
+            propose_generator = ProposeGenerator(config=config, progress=progress, cancel_event=cancel_event)
 
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num, total_questions_generated
-        data, prompt_tokens, completion_tokens, success_num, all_num, total_questions_generated = propose_generator.run(inputs=data)
+            # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num, total_questions_generated
+            data, prompt_tokens, completion_tokens, success_num, all_num, total_questions_generated = propose_generator.run(inputs=data)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+            # Publish running totals after the long-running stages only
+            task_manager.set_tokens(task_id, total_prompt_tokens, total_completion_tokens)
 
-        update_stage_progress(task_id, "propose_generator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=success_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: ProposeGenerator completed. Generated {total_questions_generated} questions from {success_num}/{all_num} chunks.")
+            update_stage_progress(task_id, "propose_generator", TaskStatus.COMPLETED, 1.0,
+                                items_processed=success_num, items_total=all_num,
+                                tokens=prompt_tokens + completion_tokens)
+            info("Task %s: ProposeGenerator completed. Generated %s questions from %s/%s chunks.",
+                 task_id, total_questions_generated, success_num, all_num)
 
         # ========================================================================
         # Stage 4: FinalAnswerGenerator - Generate final answers
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after propose_generator")
-            return
-
-        update_stage_progress(task_id, "final_answer_generator", TaskStatus.RUNNING, 0.0)
-        final_answer_generator = FinalAnswerGenerator()
+        with _pipeline_stage(task_id, "final_answer_generator") as progress:
+            from src.components.final_answer_generator import FinalAnswerGenerator
+            final_answer_generator = FinalAnswerGenerator(config=config, progress=progress, cancel_event=cancel_event)
 
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num
-        data, prompt_tokens, completion_tokens, success_num, all_num = final_answer_generator.run(inputs=data)
+            # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num
+            data, prompt_tokens, completion_tokens, success_num, all_num = final_answer_generator.run(inputs=data)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
 
-        update_stage_progress(task_id, "final_answer_generator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=success_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: FinalAnswerGenerator completed. Evaluated {success_num}/{all_num} chunks.")
+            update_stage_progress(task_id, "final_answer_generator", TaskStatus.COMPLETED, 1.0,
+                                items_processed=success_num, items_total=all_num,
+                                tokens=prompt_tokens + completion_tokens)
+            info("Task %s: FinalAnswerGenerator completed. Evaluated %s/%s chunks.", task_id, success_num, all_num)
 
         # ========================================================================
         # Stage 5: AnswerEvaluator - Evaluate answers
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after final_answer_generator")
-            return
+        with _pipeline_stage(task_id, "answer_evaluator") as progress:
+            from src.components.answer_evaluator import AnswerEvaluator
+            answer_evaluator = AnswerEvaluator(config=config, progress=progress, cancel_event=cancel_event)
 
-        update_stage_progress(task_id, "answer_evaluator", TaskStatus.RUNNING, 0.0)
-        answer_evaluator = AnswerEvaluator()
+            # Returns: data, new_gen_num, all_num, total_prompt_tokens, total_completion_tokens
+            data, new_gen_num, all_num, prompt_tokens, completion_tokens = answer_evaluator.run(inputs=data)
 
-        # Returns: data, new_gen_num, all_num, total_prompt_tokens, total_completion_tokens
-        data, new_gen_num, all_num, prompt_tokens, completion_tokens = answer_evaluator.run(inputs=data)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+            # Final totals - question extraction does not call the LLM
+            task_manager.set_tokens(task_id, total_prompt_tokens, total_completion_tokens)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        update_stage_progress(task_id, "answer_evaluator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=new_gen_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: AnswerEvaluator completed. Evaluated {new_gen_num}/{all_num} scoring tasks.")
+            update_stage_progress(task_id, "answer_evaluator", TaskStatus.COMPLETED, 1.0,
+                                items_processed=new_gen_num, items_total=all_num,
+                                tokens=prompt_tokens + completion_tokens)
+            info("Task %s: AnswerEvaluator completed. Evaluated %s/%s scoring tasks.", task_id, new_gen_num, all_num)
 
         # ========================================================================
         # Stage 6: QuestionExtractor - Extract final valid questions
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after answer_evaluator")
-            return
-
-        update_stage_progress(task_id, "question_extractor", TaskStatus.RUNNING, 0.0)
-        question_extractor = QuestionExtractor()
+        with _pipeline_stage(task_id, "question_extractor"):
+            from src.components.extract_questions import QuestionExtractor
+            question_extractor = QuestionExtractor()
 
-        # Returns: extracted_questions, total_questions
-        extracted_questions, total_extracted_questions = question_extractor.run(inputs=data)
+            # Returns: extracted_questions, total_questions
+            extracted_questions, total_extracted_questions = question_extractor.run(inputs=data)
 
-        update_stage_progress(task_id, "question_extractor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=total_extracted_questions,
-                            items_total=total_extracted_questions)
-        info(f"Task {task_id}: QuestionExtractor completed. Extracted {total_extracted_questions} valid questions.")
+            update_stage_progress(task_id, "question_extractor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=total_extracted_questions,
+                                items_total=total_extracted_questions)
+            info("Task %s: QuestionExtractor completed. Extracted %s valid questions.", task_id, total_extracted_questions)
 
         # ========================================================================
         # Save final outputs 
         # ========================================================================
 
-        from src import PROJECT_ROOT
-        from src.utils.file_utils import save_json
-
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
         # Save full pipeline output
-        full_output_path = os.path.join(
-            PROJECT_ROOT,
-            "runs",
-            f"[{timestamp}]full_output.json"
-        )
-        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
-        save_json(data, full_output_path)
-        info(f"Full pipeline output saved to {full_output_path}")
+        full_output_path = f"{_RUNS_DIR}/[{timestamp}]full_output.json"
+        stream_save_json_array(data, full_output_path)
+        info("Full pipeline output saved to %s", full_output_path)
 
         # Save extracted questions
-        extracted_output_path = os.path.join(
-            PROJECT_ROOT,
-            "runs",
-            f"[{timestamp}]extracted_questions.json"
-        )
+        extracted_output_path = f"{_RUNS_DIR}/[{timestamp}]extracted_questions.json"
         save_json(extracted_questions, extracted_output_path)
-        info(f"Extracted questions saved to {extracted_output_path}")
+        info("Extracted questions saved to %s", extracted_output_path)
 
         # ========================================================================
         # Store final results - tracking exactly what tester_single_hop.py tracks
@@ -290,19 +293,22 @@ def run_pipeline_with_tracking(task_id: str, pdf_path: str = None):
         task_manager.store_result(task_id, result)
         task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
 
-        # Log final statistics like tester_single_hop.py does
-        info("=" * 100)
-        info(f"Task {task_id}: PIPELINE COMPLETED SUCCESSFULLY".center(100))
-        info("=" * 100)
-        info(f"Total Prompt Tokens: {total_prompt_tokens}")
-        info(f"Total Completion Tokens: {total_completion_tokens}")
-        info(f"Total Tokens: {total_prompt_tokens + total_completion_tokens}")
-        info(f"Total Chunks Processed: {len(data)}")
-        info(f"Total Questions Generated: {total_questions_generated}")
-        info(f"Total Valid Questions Extracted: {total_extracted_questions}")
-        info("=" * 100)
+        info_event(
+            "pipeline_complete",
+            task_id=task_id,
+            total_prompt_tokens=total_prompt_tokens,
+            total_completion_tokens=total_completion_tokens,
+            total_tokens=total_prompt_tokens + total_completion_tokens,
+            total_chunks=len(data),
+            total_questions_generated=total_questions_generated,
+            total_valid_questions_extracted=total_extracted_questions,
+        )
+
+    except _PipelineCancelled as e:
+        # begin_stage has already marked the task CANCELLED
+        info("Task %s cancelled at %s", task_id, e)
 
     except Exception as e:
         error_msg = f"Pipeline failed: {str(e)}\n{traceback.format_exc()}"
-        error(f"Task {task_id} failed: {error_msg}")
+        error("Task %s failed: %s", task_id, error_msg)
         task_manager.set_error(task_id, error_msg)
@@ -6,14 +6,15 @@ with real-time progress updates.
 """
 import os
 import traceback
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv('multi_hop.env')
+from typing import Callable, Optional
 
+from api.config_manager import config_manager
 from api.task_manager import task_manager
-from api.models import TaskStatus, StageInfo
+from api.models import TaskStatus
+from api.progress import flush_progress
 from src.components.preprocessor import Preprocessor
 from src.components.entity_extractor import EntityExtractor
 from src.components.add_entity_id import AddEntityId
@@ -22,7 +23,16 @@ from src.components.propose_generator import ProposeGenerator
 from src.components.final_answer_generator import FinalAnswerGenerator
 from src.components.answer_evaluator import AnswerEvaluator
 from src.components.extract_questions import QuestionExtractor
-from src.utils.logger import info, error
+from src import PROJECT_ROOT
+from src.utils.file_utils import load_json, save_json, stream_save_json_array, stream_save_json_object
+from src.utils.logger import info, info_event, error
+
+# Output directory for final pipeline results, created once at import
+_RUNS_DIR = os.path.join(PROJECT_ROOT, "runs")
+try:
+    os.makedirs(_RUNS_DIR, exist_ok=True)
+except OSError:
+    pass  # Read-only checkout; saving will surface the error on first write
 
 
 def update_stage_progress(task_id: str, stage_name: str,
@@ -42,18 +52,78 @@ def update_stage_progress(task_id: str, stage_name: str,
         tokens: Tokens used by this stage
         error_msg: Error message if any
     """
-    stage_info = StageInfo(
-        name=stage_name,
-        status=status,
-        progress=progress,
-        items_processed=items_processed,
-        items_total=items_total,
-        tokens_used=tokens,
-        start_time=datetime.now() if status == TaskStatus.RUNNING else None,
-        end_time=datetime.now() if status in [TaskStatus.COMPLETED, TaskStatus.FAILED] else None,
-        error=error_msg
-    )
-    task_manager.update_stage(task_id, stage_name, stage_info)
+    task_manager.patch_stage(task_id, stage_name, status=status, progress=progress,
+                             items_processed=items_processed, items_total=items_total,
+                             tokens_used=tokens, error=error_msg)
+
+
+class _PipelineCancelled(Exception):
+    """Raised when cancellation has been requested, at a stage boundary or mid-stage"""
+
+
+def _settled_prefix_numberer(data: list, add_entity_id: AddEntityId) -> Callable[[Optional[int]], None]:
+    """
+    Build the callback that numbers entity IDs while extraction is still running.
+
+    IDs are numbered in input order, so each time an input finishes, the
+    callback numbers the longest finished prefix. Inputs that already have
+    entities are skipped by the extractor and count as finished from the start.
+    Calling it with no index numbers whatever is settled without marking
+    anything new.
+
+    Args:
+        data: Inputs being extracted, updated in place
+        add_entity_id: Numberer whose counter continues across calls
+
+    Returns:
+        Callback taking the index of the input that just finished
+    """
+    settled = ["entity" in cur_input for cur_input in data]
+    next_to_number = 0
+
+    def number_settled_prefix(i: Optional[int] = None):
+        nonlocal next_to_number
+        if i is not None:
+            settled[i] = True
+        while next_to_number < len(data) and settled[next_to_number]:
+            add_entity_id.add_ids(data[next_to_number])
+            next_to_number += 1
+
+    return number_settled_prefix
+
+
+@contextmanager
+def _pipeline_stage(task_id: str, stage_name: str):
+    """
+    Run one pipeline stage: check for cancellation and mark the stage RUNNING
+    in one task_manager call, and mark it FAILED if the body raises. The body
+    reports COMPLETED itself, since only it knows the item and token counts.
+    A component that stops on the task's cancel event raises CancelledError,
+    which marks the stage and task CANCELLED instead.
+
+    Args:
+        task_id: UUID of the task
+        stage_name: Name of the pipeline stage
+
+    Yields:
+        StageCounter: Live item counter the body can pass to its component
+
+    Raises:
+        _PipelineCancelled: If cancellation was requested before or during the stage
+    """
+    if not task_manager.begin_stage(task_id, stage_name):
+        raise _PipelineCancelled(stage_name)
+
+    try:
+        with flush_progress(task_id, stage_name) as counter:
+            yield counter
+    except CancelledError:
+        update_stage_progress(task_id, stage_name, TaskStatus.CANCELLED, 0.0)
+        task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
+        raise _PipelineCancelled(stage_name)
+    except Exception as e:
+        update_stage_progress(task_id, stage_name, TaskStatus.FAILED, 0.0, error_msg=str(e))
+        raise
 
 
 def run_multi_hop_pipeline_with_tracking(task_id: str, pdf_path: str = None):
@@ -82,6 +152,11 @@ def run_multi_hop_pipeline_with_tracking(task_id: str, pdf_path: str = None):
         task_manager.update_task_status(task_id, TaskStatus.RUNNING)
         info(f"Starting multi-hop pipeline execution for task {task_id}")
 
+        # Snapshot the runtime config once; PUT /config during the run won't affect this task
+        config = config_manager.get_config()
+        # Set by task_manager.request_cancel; LLM components stop dispatching once it is set
+        cancel_event = task_manager.get_cancel_event(task_id)
+
         total_prompt_tokens = 0
         total_completion_tokens = 0
 
@@ -89,231 +164,200 @@ def run_multi_hop_pipeline_with_tracking(task_id: str, pdf_path: str = None):
         # Stage 1: Preprocessor - Load and chunk document
         # ========================================================================
 
-        # Check cancellation before starting
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled before starting")
-            return
-
-        update_stage_progress(task_id, "preprocessor", TaskStatus.RUNNING, 0.0)
-
-        # If pdf_path provided, temporarily override environment variable
-        original_pdf_path = None
-        if pdf_path:
-            original_pdf_path = os.getenv("PREPROCESSOR_PDF_PATH")
-            # Convert absolute path to relative path from PROJECT_ROOT
-            from src import PROJECT_ROOT
-            relative_path = os.path.relpath(pdf_path, PROJECT_ROOT)
-            os.environ["PREPROCESSOR_PDF_PATH"] = relative_path
-
-        preprocessor = Preprocessor()
-        preprocessor_result = preprocessor.run()
-
-        # Restore original environment variable if it was overridden
-        if original_pdf_path is not None:
-            os.environ["PREPROCESSOR_PDF_PATH"] = original_pdf_path
-
-        # Preprocessor doesn't support direct mode, must load from file
-        from src.utils.file_utils import load_json
-        preprocessor_output_path = preprocessor.PREPROCESSOR_CHUNKED_OUTPUT_PATH
-        data = load_json(preprocessor_output_path)
-
-        prompt_tokens, completion_tokens, success_num, all_num = preprocessor_result
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        # mark as complete
-        update_stage_progress(task_id, "preprocessor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=len(data), items_total=len(data),
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: Preprocessor completed. Generated {len(data)} chunks.")
+        with _pipeline_stage(task_id, "preprocessor"):
+            # If pdf_path provided, temporarily override environment variable
+            original_pdf_path = None
+            if pdf_path:
+                original_pdf_path = os.getenv("PREPROCESSOR_PDF_PATH")
+                # Convert absolute path to relative path from PROJECT_ROOT
+                relative_path = os.path.relpath(pdf_path, PROJECT_ROOT)
+                os.environ["PREPROCESSOR_PDF_PATH"] = relative_path
+
+            preprocessor = Preprocessor(config=config)
+            preprocessor_result = preprocessor.run()
+
+            # Restore original environment variable if it was overridden
+            if original_pdf_path is not None:
+                os.environ["PREPROCESSOR_PDF_PATH"] = original_pdf_path
+
+            # Preprocessor doesn't support direct mode; use the chunks it just built,
+            # or load them from file when it reused an earlier run's output
+            data = preprocessor.last_chunk_contents
+            if data is None:
+                data = load_json(preprocessor.last_output_path)
+
+            prompt_tokens, completion_tokens, success_num, all_num = preprocessor_result
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+
+            # mark as complete
+            update_stage_progress(task_id, "preprocessor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=len(data), items_total=len(data),
+                                tokens=prompt_tokens + completion_tokens)
+            info(f"Task {task_id}: Preprocessor completed. Generated {len(data)} chunks.")
 
         # ========================================================================
         # Stage 2: EntityExtractor - Extract entities and relationships
         # ========================================================================
 
-        # Check cancellation between stages
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after preprocessor")
-            return
+        with _pipeline_stage(task_id, "entity_extractor") as progress:
+            entity_extractor = EntityExtractor(config=config, progress=progress, cancel_event=cancel_event)
+            add_entity_id = AddEntityId()
 
-        update_stage_progress(task_id, "entity_extractor", TaskStatus.RUNNING, 0.0)
-        entity_extractor = EntityExtractor()
+            # Stage 3 is pipelined into this stage
+            _number_settled_prefix = _settled_prefix_numberer(data, add_entity_id)
 
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_rate, total_entities, total_relationships
-        data, prompt_tokens, completion_tokens, success_rate, total_entities, total_relationships = entity_extractor.run(inputs=data)
+            # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_rate, total_entities, total_relationships
+            # (run() updates data in place, so the callback sees each finished input)
+            data, prompt_tokens, completion_tokens, success_rate, total_entities, total_relationships = entity_extractor.run(
+                inputs=data, on_result=_number_settled_prefix)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
 
-        update_stage_progress(task_id, "entity_extractor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=len(data), items_total=len(data),
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: EntityExtractor completed. Extracted {total_entities} entities and {total_relationships} relationships (success rate: {success_rate}).")
+            update_stage_progress(task_id, "entity_extractor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=len(data), items_total=len(data),
+                                tokens=prompt_tokens + completion_tokens)
+            info(f"Task {task_id}: EntityExtractor completed. Extracted {total_entities} entities and {total_relationships} relationships (success rate: {success_rate}).")
 
         # ========================================================================
         # Stage 3: AddEntityId - Assign unique IDs to entities
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after entity_extractor")
-            return
-
-        update_stage_progress(task_id, "add_entity_id", TaskStatus.RUNNING, 0.0)
-        add_entity_id = AddEntityId()
-
-        # Returns: inputs, processed_count, entity_id_beg
-        data, processed_count, entity_id_beg = add_entity_id.run(inputs=data)
+        with _pipeline_stage(task_id, "add_entity_id"):
+            # Number whatever the extractor did not report (e.g. a trailing run of skipped inputs)
+            _number_settled_prefix()
+            processed_count, entity_id_beg = add_entity_id.processed_count, add_entity_id.entity_id_beg
 
-        update_stage_progress(task_id, "add_entity_id", TaskStatus.COMPLETED, 1.0,
-                            items_processed=processed_count, items_total=processed_count)
-        info(f"Task {task_id}: AddEntityId completed. Processed {processed_count} chunks, assigned IDs starting from {entity_id_beg}.")
+            update_stage_progress(task_id, "add_entity_id", TaskStatus.COMPLETED, 1.0,
+                                items_processed=processed_count, items_total=processed_count)
+            info(f"Task {task_id}: AddEntityId completed. Processed {processed_count} chunks, assigned IDs starting from {entity_id_beg}.")
 
         # ========================================================================
         # Stage 4: EntityEliminator - Resolve duplicate entities
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after add_entity_id")
-            return
+        with _pipeline_stage(task_id, "entity_eliminator"):
+            entity_eliminator = EntityEliminator(config=config)
 
-        update_stage_progress(task_id, "entity_eliminator", TaskStatus.RUNNING, 0.0)
-        entity_eliminator = EntityEliminator()
+            # Returns: inputs, entityid2entityid, total_prompt_tokens, total_completion_tokens, original_count, unique_count
+            data, entityid2entityid, prompt_tokens, completion_tokens, original_count, unique_count = entity_eliminator.run(inputs=data)
 
-        # Returns: inputs, entityid2entityid, total_prompt_tokens, total_completion_tokens, original_count, unique_count
-        data, entityid2entityid, prompt_tokens, completion_tokens, original_count, unique_count = entity_eliminator.run(inputs=data)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+            # Publish running totals after the long-running stages only
+            task_manager.set_tokens(task_id, total_prompt_tokens, total_completion_tokens)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        update_stage_progress(task_id, "entity_eliminator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=unique_count, items_total=original_count,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: EntityEliminator completed. Reduced {original_count} entities to {unique_count} unique entities.")
+            update_stage_progress(task_id, "entity_eliminator", TaskStatus.COMPLETED, 1.0,
+                                items_processed=unique_count, items_total=original_count,
+                                tokens=prompt_tokens + completion_tokens)
+            info(f"Task {task_id}: EntityEliminator completed. Reduced {original_count} entities to {unique_count} unique entities.")
 
         # ========================================================================
         # Stage 5: ProposeGenerator - Generate proposed questions
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after entity_eliminator")
-            return
-
-        update_stage_progress(task_id, "propose_generator", TaskStatus.RUNNING, 0.0)
-        propose_generator = ProposeGenerator()
+        with _pipeline_stage(task_id, "propose_generator") as progress:
+            propose_generator = ProposeGenerator(config=config, progress=progress, cancel_event=cancel_event)
 
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num, total_questions_generated
-        data, prompt_tokens, completion_tokens, success_num, all_num, total_questions_generated = propose_generator.run(inputs=data)
+            # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num, total_questions_generated
+            data, prompt_tokens, completion_tokens, success_num, all_num, total_questions_generated = propose_generator.run(inputs=data)
 
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
+            total_prompt_tokens += prompt_tokens
+            total_completion_tokens += completion_tokens
+            task_manager.set_tokens(task_id, total_prompt_tokens, total_completion_tokens)
 
-        update_stage_progress(task_id, "propose_generator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=success_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: ProposeGenerator completed. Generated {total_questions_generated} questions from {success_num}/{all_num} entities.")
+            update_stage_progress(task_id, "propose_generator", TaskStatus.COMPLETED, 1.0,
+                                items_processed=success_num, items_total=all_num,
+                                tokens=prompt_tokens + completion_tokens)
+            info(f"Task {task_id}: ProposeGenerator completed. Generated {total_questions_generated} questions from {success_num}/{all_num} entities.")
 
         # ========================================================================
-        # Stage 6: FinalAnswerGenerator - Generate final answers
+        # Stages 6+7: FinalAnswerGenerator and AnswerEvaluator, run concurrently
         # ========================================================================
-
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after propose_generator")
-            return
-
-        update_stage_progress(task_id, "final_answer_generator", TaskStatus.RUNNING, 0.0)
-        final_answer_generator = FinalAnswerGenerator()
-
-        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num
-        data, prompt_tokens, completion_tokens, success_num, all_num = final_answer_generator.run(inputs=data)
-
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        update_stage_progress(task_id, "final_answer_generator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=success_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: FinalAnswerGenerator completed. Evaluated {success_num}/{all_num} items.")
-
-        # ========================================================================
-        # Stage 7: AnswerEvaluator - Evaluate answers
-        # ========================================================================
-
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after final_answer_generator")
-            return
-
-        update_stage_progress(task_id, "answer_evaluator", TaskStatus.RUNNING, 0.0)
-        answer_evaluator = AnswerEvaluator()
-
-        # Returns: data, new_gen_num, all_num, total_prompt_tokens, total_completion_tokens
-        data, new_gen_num, all_num, prompt_tokens, completion_tokens = answer_evaluator.run(inputs=data)
-
-        total_prompt_tokens += prompt_tokens
-        total_completion_tokens += completion_tokens
-        task_manager.update_tokens(task_id, prompt_tokens, completion_tokens)
-
-        update_stage_progress(task_id, "answer_evaluator", TaskStatus.COMPLETED, 1.0,
-                            items_processed=new_gen_num, items_total=all_num,
-                            tokens=prompt_tokens + completion_tokens)
-        info(f"Task {task_id}: AnswerEvaluator completed. Evaluated {new_gen_num}/{all_num} scoring tasks.")
+        # AnswerEvaluator only scores the proposed 'answer' of each question, which
+        # FinalAnswerGenerator never modifies (it adds 'positive' / 'corrected-answer'),
+        # so the two LLM-bound stages overlap instead of running back to back.
+
+        stage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"AnswerEvaluator-{task_id[:8]}")
+        try:
+            # The evaluator's stage spans the whole overlap, so it reports live progress
+            # while FinalAnswerGenerator is still running
+            with _pipeline_stage(task_id, "answer_evaluator") as evaluator_progress:
+                answer_evaluator = AnswerEvaluator(config=config, progress=evaluator_progress, cancel_event=cancel_event)
+                answer_evaluator_future = stage_executor.submit(answer_evaluator.run, inputs=data)
+
+                try:
+                    with _pipeline_stage(task_id, "final_answer_generator") as progress:
+                        final_answer_generator = FinalAnswerGenerator(config=config, progress=progress, cancel_event=cancel_event)
+
+                        # Returns: inputs, total_prompt_tokens, total_completion_tokens, success_num, all_num
+                        data, prompt_tokens, completion_tokens, success_num, all_num = final_answer_generator.run(inputs=data)
+
+                        total_prompt_tokens += prompt_tokens
+                        total_completion_tokens += completion_tokens
+
+                        update_stage_progress(task_id, "final_answer_generator", TaskStatus.COMPLETED, 1.0,
+                                            items_processed=success_num, items_total=all_num,
+                                            tokens=prompt_tokens + completion_tokens)
+                        info(f"Task {task_id}: FinalAnswerGenerator completed. Evaluated {success_num}/{all_num} items.")
+                except BaseException as e:
+                    # FinalAnswerGenerator failed or the task was cancelled: stop the evaluator
+                    # after its in-flight calls, then settle its stage the same way
+                    answer_evaluator.stop_event.set()
+                    stage_executor.shutdown(wait=True, cancel_futures=True)
+                    if isinstance(e, _PipelineCancelled):
+                        raise CancelledError() from e
+                    raise
+
+                # Returns: data, new_gen_num, all_num, total_prompt_tokens, total_completion_tokens
+                # (data is the same object FinalAnswerGenerator returned, annotated in place)
+                _, new_gen_num, all_num, prompt_tokens, completion_tokens = answer_evaluator_future.result()
+
+                total_prompt_tokens += prompt_tokens
+                total_completion_tokens += completion_tokens
+                # Final totals - question extraction does not call the LLM
+                task_manager.set_tokens(task_id, total_prompt_tokens, total_completion_tokens)
+
+                update_stage_progress(task_id, "answer_evaluator", TaskStatus.COMPLETED, 1.0,
+                                    items_processed=new_gen_num, items_total=all_num,
+                                    tokens=prompt_tokens + completion_tokens)
+                info(f"Task {task_id}: AnswerEvaluator completed. Evaluated {new_gen_num}/{all_num} scoring tasks.")
+        finally:
+            # Never leave the evaluator running past this point
+            stage_executor.shutdown(wait=True, cancel_futures=True)
 
         # ========================================================================
         # Stage 8: QuestionExtractor - Extract final valid questions
         # ========================================================================
 
-        if task_manager.is_cancelled(task_id):
-            task_manager.update_task_status(task_id, TaskStatus.CANCELLED)
-            info(f"Task {task_id} cancelled after answer_evaluator")
-            return
+        with _pipeline_stage(task_id, "question_extractor"):
+            question_extractor = QuestionExtractor()
 
-        update_stage_progress(task_id, "question_extractor", TaskStatus.RUNNING, 0.0)
-        question_extractor = QuestionExtractor()
+            # Returns: extracted_questions, total_questions
+            extracted_questions, total_extracted_questions = question_extractor.run(inputs=data)
 
-        # Returns: extracted_questions, total_questions
-        extracted_questions, total_extracted_questions = question_extractor.run(inputs=data)
-
-        update_stage_progress(task_id, "question_extractor", TaskStatus.COMPLETED, 1.0,
-                            items_processed=total_extracted_questions,
-                            items_total=total_extracted_questions)
-        info(f"Task {task_id}: QuestionExtractor completed. Extracted {total_extracted_questions} valid questions.")
+            update_stage_progress(task_id, "question_extractor", TaskStatus.COMPLETED, 1.0,
+                                items_processed=total_extracted_questions,
+                                items_total=total_extracted_questions)
+            info(f"Task {task_id}: QuestionExtractor completed. Extracted {total_extracted_questions} valid questions.")
 
         # ========================================================================
         # Save final outputs
         # ========================================================================
 
-        from src import PROJECT_ROOT
-        from src.utils.file_utils import save_json
-
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Save full pipeline output
-        full_output_path = os.path.join(
-            PROJECT_ROOT,
-            "runs",
-            f"[{timestamp}]multi_hop_full_output.json"
-        )
-        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
-        save_json(data, full_output_path)
+        # Save full pipeline output (content mode yields a list of chunks, entity-graph mode a dict)
+        full_output_path = f"{_RUNS_DIR}/[{timestamp}]multi_hop_full_output.json"
+        if isinstance(data, dict):
+            stream_save_json_object(data, full_output_path)
+        else:
+            stream_save_json_array(data, full_output_path)
         info(f"Full pipeline output saved to {full_output_path}")
 
         # Save extracted questions
-        extracted_output_path = os.path.join(
-            PROJECT_ROOT,
-            "runs",
-            f"[{timestamp}]multi_hop_extracted_questions.json"
-        )
+        extracted_output_path = f"{_RUNS_DIR}/[{timestamp}]multi_hop_extracted_questions.json"
         save_json(extracted_questions, extracted_output_path)
         info(f"Extracted questions saved to {extracted_output_path}")
 
@@ -340,20 +384,23 @@ def run_multi_hop_pipeline_with_tracking(task_id: str, pdf_path: str = None):
         task_manager.store_result(task_id, result)
         task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
 
-        # Log final statistics like tester_multi_hop.py does
-        info("=" * 100)
-        info(f"Task {task_id}: MULTI-HOP PIPELINE COMPLETED SUCCESSFULLY".center(100))
-        info("=" * 100)
-        info(f"Total Prompt Tokens: {total_prompt_tokens}")
-        info(f"Total Completion Tokens: {total_completion_tokens}")
-        info(f"Total Tokens: {total_prompt_tokens + total_completion_tokens}")
-        info(f"Total Chunks Processed: {result['total_chunks']}")
-        info(f"Total Entities Extracted: {total_entities}")
-        info(f"Total Relationships Extracted: {total_relationships}")
-        info(f"Unique Entities After Elimination: {unique_count}")
-        info(f"Total Questions Generated: {total_questions_generated}")
-        info(f"Total Valid Questions Extracted: {total_extracted_questions}")
-        info("=" * 100)
+        info_event(
+            "multi_hop_pipeline_complete",
+            task_id=task_id,
+            total_prompt_tokens=total_prompt_tokens,
+            total_completion_tokens=total_completion_tokens,
+            total_tokens=total_prompt_tokens + total_completion_tokens,
+            total_chunks=result["total_chunks"],
+            total_entities=total_entities,
+            total_relationships=total_relationships,
+            unique_entity_count=unique_count,
+            total_questions_generated=total_questions_generated,
+            total_valid_questions_extracted=total_extracted_questions,
+        )
+
+    except _PipelineCancelled as e:
+        # begin_stage has already marked the task CANCELLED
+        info(f"Task {task_id} cancelled at {e}")
 
     except Exception as e:
         error_msg = f"Multi-hop pipeline failed: {str(e)}\n{traceback.format_exc()}"
@@ -0,0 +1,70 @@
+"""
+Live per-item progress for running pipeline stages.
+
+Components bump a StageCounter as each item finishes. A flusher thread
+publishes the counter to the task manager every FLUSH_INTERVAL seconds, so
+the task lock is taken a few times per second per stage instead of once
+per item.
+"""
+import threading
+from contextlib import contextmanager
+
+from api.task_manager import task_manager
+
+# Seconds between progress flushes
+FLUSH_INTERVAL = 0.2
+
+
+class StageCounter:
+    """
+    Items finished and total items for one stage.
+
+    Components update it from the single thread that collects their futures,
+    and the flusher only reads it, so plain int attributes are enough.
+    """
+    __slots__ = ("processed", "total")
+
+    def __init__(self):
+        self.processed = 0
+        self.total = 0
+
+    def set_total(self, total: int):
+        self.total = total
+
+    def increment(self, n: int = 1):
+        self.processed += n
+
+
+@contextmanager
+def flush_progress(task_id: str, stage_name: str, interval: float = FLUSH_INTERVAL):
+    """
+    Yield a StageCounter for a stage and publish it periodically until the block exits.
+
+    Flushes only touch the progress fields of a RUNNING stage, so the stage's
+    own COMPLETED/FAILED update always wins over a late flush.
+
+    Args:
+        task_id: UUID of the task
+        stage_name: Name of the pipeline stage
+        interval: Seconds between flushes
+    """
+    counter = StageCounter()
+    stop = threading.Event()
+
+    def _flush_loop():
+        last = None
+        while not stop.wait(interval):
+            processed, total = counter.processed, counter.total
+            if total and (processed, total) != last:
+                last = (processed, total)
+                task_manager.patch_stage(task_id, stage_name,
+                                         progress=min(processed / total, 1.0),
+                                         items_processed=processed, items_total=total)
+
+    flusher = threading.Thread(target=_flush_loop, daemon=True, name=f"Progress-{task_id[:8]}")
+    flusher.start()
+    try:
+        yield counter
+    finally:
+        stop.set()
+        flusher.join()
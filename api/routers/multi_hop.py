@@ -4,8 +4,9 @@ Multi-hop pipeline endpoints.
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from api.models import TaskSubmitResponse, TaskType
 from api.task_manager import task_manager
+from api.pipeline_pool import submit_pipeline
+from api.uploads import save_upload
 from api.pipeline_runner_multi_hop import run_multi_hop_pipeline_with_tracking
-import threading
 from pathlib import Path
 from typing import Optional
 from src import PROJECT_ROOT
@@ -16,7 +17,7 @@ router = APIRouter()
 @router.post("/run", response_model=TaskSubmitResponse)
 async def run_multi_hop(file: Optional[UploadFile] = File(None)):
     """
-    Submit a multi-hop pipeline task to run in a separate thread.
+    Submit a multi-hop pipeline task to run in a background thread.
     
     Args:
         file: Optional PDF file to upload and process. If not provided,
@@ -40,21 +41,14 @@ async def run_multi_hop(file: Optional[UploadFile] = File(None)):
         pdf_path = upload_dir / file.filename
 
         # Save uploaded file
-        with open(pdf_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        await save_upload(file, pdf_path)
 
     # Create task with MULTI_HOP type
     task_id = task_manager.create_task(task_type=TaskType.MULTI_HOP)
 
-    # Run in separate thread
-    thread = threading.Thread(
-        target=run_multi_hop_pipeline_with_tracking,
-        args=(task_id, str(pdf_path) if pdf_path else None),
-        daemon=True,
-        name=f"MultiHopPipeline-{task_id[:8]}"
-    )
-    thread.start()
+    # Run in a background thread (queued if too many pipelines are already running)
+    submit_pipeline(run_multi_hop_pipeline_with_tracking, task_id, str(pdf_path) if pdf_path else None,
+                    name_prefix="MultiHopPipeline")
 
     message = f"Multi-hop task {task_id} submitted successfully. Use /tasks/{task_id} to check status."
     if file:
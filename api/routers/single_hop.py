@@ -4,8 +4,9 @@ Single-hop pipeline endpoints.
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from api.models import TaskSubmitResponse, TaskType
 from api.task_manager import task_manager
+from api.pipeline_pool import submit_pipeline
+from api.uploads import save_upload
 from api.pipeline_runner import run_pipeline_with_tracking
-import threading
 from pathlib import Path
 from typing import Optional
 from src import PROJECT_ROOT
@@ -16,7 +17,7 @@ router = APIRouter()
 @router.post("/run", response_model=TaskSubmitResponse)
 async def run_single_hop(file: Optional[UploadFile] = File(None)):
     """
-    Submit a single-hop pipeline task that runs in a separate thread.
+    Submit a single-hop pipeline task that runs in a background thread.
     
     Args:
         file: Optional PDF file to upload and process. If not provided,
@@ -40,21 +41,14 @@ async def run_single_hop(file: Optional[UploadFile] = File(None)):
         pdf_path = upload_dir / file.filename
 
         # Save uploaded file
-        with open(pdf_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        await save_upload(file, pdf_path)
 
     # Create task with SINGLE_HOP type
     task_id = task_manager.create_task(task_type=TaskType.SINGLE_HOP)
 
-    # Run in separate thread
-    thread = threading.Thread(
-        target=run_pipeline_with_tracking,
-        args=(task_id, str(pdf_path) if pdf_path else None),
-        daemon=True,
-        name=f"Pipeline-{task_id[:8]}"
-    )
-    thread.start()
+    # Run in a background thread (queued if too many pipelines are already running)
+    submit_pipeline(run_pipeline_with_tracking, task_id, str(pdf_path) if pdf_path else None,
+                    name_prefix="Pipeline")
 
     message = f"Task {task_id} submitted successfully. Use /tasks/{task_id} to check status."
     if file:
@@ -4,13 +4,62 @@ Task Management Router.
 Provides endpoints for querying task status, retrieving results,
 and managing background pipeline tasks.
 """
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from api.models import TaskStatusResponse, TaskResultResponse, TaskStatus, TaskListResponse
 from api.task_manager import task_manager
+import orjson
 import os
 
-router = APIRouter()
+# orjson serializes datetimes natively, so handlers can return task_manager dicts as-is
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Same options as ORJSONResponse and as file_utils uses to save these results
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Streamed result bodies are sent in pieces of roughly this many bytes
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_json_collection(collection):
+    """Yield the JSON encoding of a list or dict one element at a time"""
+    if isinstance(collection, dict):
+        yield b"{"
+        for i, (key, value) in enumerate(collection.items()):
+            yield (b"," if i else b"") + orjson.dumps(str(key)) + b":" + orjson.dumps(value, option=_ORJSON_OPTIONS)
+        yield b"}"
+    else:
+        yield b"["
+        for i, item in enumerate(collection):
+            yield (b"," if i else b"") + orjson.dumps(item, option=_ORJSON_OPTIONS)
+        yield b"]"
+
+
+def _stream_result_json(summary: dict, results, extracted_questions):
+    """
+    Encode a task result as one JSON object, element by element.
+
+    The summary fields come first, then the results and extracted_questions
+    collections. Output is grouped into chunks of about _STREAM_CHUNK_BYTES.
+    StreamingResponse runs this sync generator in the threadpool, so
+    encoding never blocks the event loop.
+    """
+    def _pieces():
+        yield orjson.dumps(summary, option=_ORJSON_OPTIONS)[:-1] + b',"results":'
+        yield from _iter_json_collection(results)
+        yield b',"extracted_questions":'
+        yield from _iter_json_collection(extracted_questions)
+        yield b"}"
+
+    buffer = bytearray()
+    for piece in _pieces():
+        buffer += piece
+        if len(buffer) >= _STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
 
 
 @router.get("/", response_model=TaskListResponse)
@@ -23,69 +72,61 @@ async def list_tasks():
     """
     tasks = task_manager.list_all_tasks()
 
-    # Format datetime objects to ISO strings
-    for task in tasks:
-        task["created_at"] = task["created_at"].isoformat()
-        task["started_at"] = task["started_at"].isoformat() if task["started_at"] else None
-        task["completed_at"] = task["completed_at"].isoformat() if task["completed_at"] else None
-
-    return TaskListResponse(
-        total=len(tasks),
-        tasks=tasks
-    )
+    # Returning the response directly skips response_model validation and
+    # jsonable_encoder; the model still documents the schema
+    return ORJSONResponse({
+        "total": len(tasks),
+        "tasks": tasks
+    })
 
 
 @router.get("/{task_id}")
-async def get_task_status(task_id: str):
+async def get_task_status(task_id: str, request: Request):
     """
     Get current status and progress of a task.
 
+    The response carries an ETag that changes whenever the task does. A poll
+    sending it back in If-None-Match gets an empty 304 until then.
+
     Args:
         task_id: UUID of the task
+        request: Incoming request, for its If-None-Match header
 
     Returns:
-        Task status as plain dict (non-blocking)
+        Task status as plain dict (non-blocking), or 304 Not Modified
 
     Raises:
         HTTPException: 404 if task not found
     """
+    version = task_manager.get_task_version(task_id)
+
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and f'"{version}"' in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": f'"{version}"'})
+
     task = task_manager.get_task(task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
-    # Calculate progress from stages
-    if task["stages"]:
-        num_stages = len(task["stages"])
-        if num_stages > 0:
-            progress = sum(stage["progress"] for stage in task["stages"].values()) / num_stages
-        else:
-            progress = 0.0
-    else:
-        progress = 0.0
-
-    # Convert datetime objects to ISO format
-    stages_formatted = {
-        name: {
-            **stage,
-            "start_time": stage["start_time"].isoformat() if stage["start_time"] else None,
-            "end_time": stage["end_time"].isoformat() if stage["end_time"] else None
-        }
-        for name, stage in task["stages"].items()
-    }
+    # Average progress of the stages started so far
+    progress = task["progress_sum"] / len(task["stages"]) if task["stages"] else 0.0
 
-    return {
+    return ORJSONResponse({
         "task_id": task["task_id"],
         "status": task["status"],
         "current_stage": task["current_stage"],
         "progress": progress,
-        "stages": stages_formatted,
-        "created_at": task["created_at"].isoformat(),
-        "started_at": task["started_at"].isoformat() if task["started_at"] else None,
-        "completed_at": task["completed_at"].isoformat() if task["completed_at"] else None,
+        "stages": task["stages"],
+        "created_at": task["created_at"],
+        "started_at": task["started_at"],
+        "completed_at": task["completed_at"],
         "total_tokens": task["total_prompt_tokens"] + task["total_completion_tokens"],
         "error": task["error"]
-    }
+    }, headers={"ETag": f'"{task["version"]}"'})
 
 
 @router.get("/{task_id}/result", response_model=TaskResultResponse)
@@ -113,7 +154,8 @@ async def get_task_result(task_id: str):
             detail=f"Task is not completed yet. Current status: {task['status']}"
         )
 
-    result = task_manager.get_result(task_id)
+    # May reload evicted result data from disk, so keep it off the event loop
+    result = await run_in_threadpool(task_manager.get_result, task_id)
 
     if not result:
         raise HTTPException(status_code=404, detail="Task result not found")
@@ -122,17 +164,21 @@ async def get_task_result(task_id: str):
     # Single-hop has "total_facts", multi-hop has "total_entities"
     total_facts = result.get("total_facts", result.get("total_entities", 0))
 
-    return TaskResultResponse(
-        task_id=task_id,
-        status=task["status"],
-        total_chunks=result["total_chunks"],
-        total_facts=total_facts,
-        total_questions_generated=result["total_questions_generated"],
-        total_valid_questions_extracted=result["total_valid_questions_extracted"],
-        total_prompt_tokens=result["total_prompt_tokens"],
-        total_completion_tokens=result["total_completion_tokens"],
-        results=result["data"],
-        extracted_questions=result["extracted_questions"]
+    # results can hold thousands of questions; stream them out as they are
+    # encoded instead of building the whole body (or a TaskResultResponse) first
+    summary = {
+        "task_id": task_id,
+        "status": task["status"],
+        "total_chunks": result["total_chunks"],
+        "total_facts": total_facts,
+        "total_questions_generated": result["total_questions_generated"],
+        "total_valid_questions_extracted": result["total_valid_questions_extracted"],
+        "total_prompt_tokens": result["total_prompt_tokens"],
+        "total_completion_tokens": result["total_completion_tokens"]
+    }
+    return StreamingResponse(
+        _stream_result_json(summary, result["data"], result["extracted_questions"]),
+        media_type="application/json"
     )
 
 
@@ -141,7 +187,8 @@ async def cancel_task(task_id: str):
     """
     Request cancellation of a running task.
 
-    The task will stop at the next stage boundary (between pipeline stages).
+    LLM stages stop dispatching new calls and the task stops once the calls
+    already in flight finish; other stages stop at the next stage boundary.
     Already completed stages will not be rolled back.
 
     Args:
@@ -167,7 +214,7 @@ async def cancel_task(task_id: str):
     task_manager.request_cancel(task_id)
 
     return {
-        "message": f"Cancellation requested for task {task_id}. Task will stop at next stage boundary.",
+        "message": f"Cancellation requested for task {task_id}. Task will stop once its in-flight LLM calls finish.",
         "task_id": task_id
     }
 
@@ -194,13 +241,7 @@ async def delete_task(task_id: str):
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
     # Remove from task manager
-    with task_manager.lock:
-        if task_id in task_manager.tasks:
-            del task_manager.tasks[task_id]
-        if task_id in task_manager.results:
-            del task_manager.results[task_id]
-        if task_id in task_manager.cancel_flags:
-            del task_manager.cancel_flags[task_id]
+    task_manager.delete_task(task_id)
 
     return {"message": f"Task {task_id} deleted successfully"}
 
@@ -230,14 +271,17 @@ async def download_full_output(task_id: str):
             detail=f"Task is not completed yet. Current status: {task['status']}"
         )
 
-    result = task_manager.get_result(task_id)
+    result = task_manager.get_result(task_id, with_data=False)
 
     if not result or "full_output_path" not in result:
         raise HTTPException(status_code=404, detail="Full output file path not found")
 
     file_path = result["full_output_path"]
 
-    if not os.path.exists(file_path):
+    # One stat serves both the existence check and FileResponse, which would otherwise stat again
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
 
     filename = os.path.basename(file_path)
@@ -245,7 +289,8 @@ async def download_full_output(task_id: str):
     return FileResponse(
         path=file_path,
         media_type="application/json",
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
 
 
@@ -274,14 +319,17 @@ async def download_extracted_questions(task_id: str):
             detail=f"Task is not completed yet. Current status: {task['status']}"
         )
 
-    result = task_manager.get_result(task_id)
+    result = task_manager.get_result(task_id, with_data=False)
 
     if not result or "extracted_output_path" not in result:
         raise HTTPException(status_code=404, detail="Extracted questions file path not found")
 
     file_path = result["extracted_output_path"]
 
-    if not os.path.exists(file_path):
+    # One stat serves both the existence check and FileResponse, which would otherwise stat again
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
 
     filename = os.path.basename(file_path)
@@ -289,5 +337,6 @@ async def download_extracted_questions(task_id: str):
     return FileResponse(
         path=file_path,
         media_type="application/json",
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
@@ -3,13 +3,76 @@ Task Manager for handling background pipeline tasks.
 
 Provides in-memory storage for task metadata, status, and results.
 Thread-safe operations for concurrent task management.
+
+Writes to a task are serialized by one of a fixed set of shard locks chosen
+by task_id, so concurrent pipelines and status polls for different tasks do
+not contend. Single-key reads of the task, result and cancel dicts are
+atomic under the GIL and take no lock.
 """
+import os
+import time
 import uuid
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from typing import Dict, Optional, Any
-from threading import Lock
-from copy import deepcopy
+from threading import Event, Lock
 from api.models import TaskInfo, TaskStatus, StageInfo, TaskType
+from src.utils.file_utils import load_json
+
+
+# Number of shard locks; tasks hash onto them by task_id
+_NUM_LOCK_SHARDS = 16
+
+# Number of task results whose full data is kept in memory; older ones are
+# reloaded on demand from the output files the pipeline saved
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "8"))
+
+# Result keys holding the bulky pipeline data, and the saved file each is reloaded from
+_RESULT_DATA_FILES = {"data": "full_output_path", "extracted_questions": "extracted_output_path"}
+
+# Task statuses that record completed_at
+_END_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED})
+
+
+def _monotonic_to_datetime(task: TaskInfo, ns: Optional[int]) -> Optional[datetime]:
+    """Convert a monotonic_ns stage timestamp to wall-clock time using the task's anchor"""
+    if ns is None:
+        return None
+    return task.created_at + timedelta(microseconds=(ns - task.created_ns) // 1000)
+
+
+def _stage_view(task: TaskInfo, stage: StageInfo) -> Dict[str, Any]:
+    """
+    Plain-dict form of a stage, built once and reused until the stage changes.
+
+    Finished stages never change again, so most polls serve every stage but
+    the running one from the cache. Callers must treat the dict as read-only.
+    """
+    view = stage.view_cache
+    if view is None:
+        view = stage.view_cache = {
+            "name": stage.name,
+            "status": stage.status.value,
+            "progress": stage.progress,
+            "items_processed": stage.items_processed,
+            "items_total": stage.items_total,
+            "tokens_used": stage.tokens_used,
+            "start_time": _monotonic_to_datetime(task, stage.start_time),
+            "end_time": _monotonic_to_datetime(task, stage.end_time),
+            "error": stage.error
+        }
+    return view
+
+
+def _task_now(task: TaskInfo) -> datetime:
+    """
+    Current wall-clock time on the task's monotonic timeline.
+
+    Task transition times are derived from the same anchor as stage times, so
+    created_at <= started_at <= stage times <= completed_at holds even if the
+    system clock is stepped mid-pipeline.
+    """
+    return _monotonic_to_datetime(task, time.monotonic_ns())
 
 
 class TaskManager:
@@ -18,13 +81,24 @@ class TaskManager:
     Stores task metadata, status, and results.
 
     Note: All task data is stored in memory and will be lost on server restart.
+    Only the RESULT_CACHE_MAX_ENTRIES most recently used results keep their
+    data in memory; the rest keep their summary and reload the data from the
+    pipeline's saved output files when requested.
     """
 
     def __init__(self):
         self.tasks: Dict[str, TaskInfo] = {}
         self.results: Dict[str, Dict[str, Any]] = {}
-        self.cancel_flags: Dict[str, bool] = {}  # Track cancellation requests
-        self.lock = Lock()
+        self.cancel_events: Dict[str, Event] = {}  # Set when cancellation is requested
+        self._locks = [Lock() for _ in range(_NUM_LOCK_SHARDS)]
+        # task_ids whose result data is in memory, least recently used first.
+        # Lock order: _resident_lock before any shard lock.
+        self._resident_results: OrderedDict = OrderedDict()
+        self._resident_lock = Lock()
+
+    def _lock_for(self, task_id: str) -> Lock:
+        """Shard lock guarding the given task's records"""
+        return self._locks[hash(task_id) % _NUM_LOCK_SHARDS]
 
     def create_task(self, task_type: TaskType = TaskType.SINGLE_HOP) -> str:
         """
@@ -38,14 +112,16 @@ class TaskManager:
         """
         task_id = str(uuid.uuid4())
 
-        with self.lock:
+        with self._lock_for(task_id):
             self.tasks[task_id] = TaskInfo(
                 task_id=task_id,
                 task_type=task_type,
                 status=TaskStatus.PENDING,
                 created_at=datetime.now(),
+                created_ns=time.monotonic_ns(),
                 stages={}
             )
+            self.cancel_events[task_id] = Event()
 
         return task_id
 
@@ -53,17 +129,20 @@ class TaskManager:
         """
         Get task info by ID as plain dict (fastest, non-blocking).
 
+        Only the task's own shard lock is taken, so the snapshot is consistent
+        without waiting on writes to other tasks.
+
         Args:
             task_id: UUID of the task
 
         Returns:
             Plain dict with task data or None if not found
         """
-        with self.lock:
-            task = self.tasks.get(task_id)
-            if not task:
-                return None
+        task = self.tasks.get(task_id)
+        if not task:
+            return None
 
+        with self._lock_for(task_id):
             # Convert to plain dict in one shot - no Pydantic overhead
             return {
                 "task_id": task.task_id,
@@ -73,25 +152,30 @@ class TaskManager:
                 "started_at": task.started_at,
                 "completed_at": task.completed_at,
                 "current_stage": task.current_stage,
-                "stages": {
-                    name: {
-                        "name": stage.name,
-                        "status": stage.status.value,
-                        "progress": stage.progress,
-                        "items_processed": stage.items_processed,
-                        "items_total": stage.items_total,
-                        "tokens_used": stage.tokens_used,
-                        "start_time": stage.start_time,
-                        "end_time": stage.end_time,
-                        "error": stage.error
-                    }
-                    for name, stage in task.stages.items()
-                },
+                "progress_sum": task.progress_sum,
+                "stages": {name: _stage_view(task, stage) for name, stage in task.stages.items()},
                 "total_prompt_tokens": task.total_prompt_tokens,
                 "total_completion_tokens": task.total_completion_tokens,
-                "error": task.error
+                "error": task.error,
+                "version": task.version
             }
 
+    def get_task_version(self, task_id: str) -> Optional[int]:
+        """
+        Get a task's change counter, which increases on every update to the task.
+
+        Lets a status poll tell whether anything changed without building the
+        task dict.
+
+        Args:
+            task_id: UUID of the task
+
+        Returns:
+            int version, or None if not found
+        """
+        task = self.tasks.get(task_id)
+        return task.version if task else None
+
     def update_task_status(self, task_id: str, status: TaskStatus):
         """
         Update overall task status.
@@ -100,13 +184,14 @@ class TaskManager:
             task_id: UUID of the task
             status: New status to set
         """
-        with self.lock:
+        with self._lock_for(task_id):
             if task_id in self.tasks:
                 self.tasks[task_id].status = status
-                if status == TaskStatus.RUNNING and not self.tasks[task_id].started_at:
-                    self.tasks[task_id].started_at = datetime.now()
-                elif status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-                    self.tasks[task_id].completed_at = datetime.now()
+                self.tasks[task_id].version += 1
+                if status is TaskStatus.RUNNING and not self.tasks[task_id].started_at:
+                    self.tasks[task_id].started_at = _task_now(self.tasks[task_id])
+                elif status in _END_STATUSES:
+                    self.tasks[task_id].completed_at = _task_now(self.tasks[task_id])
 
     def update_stage(self, task_id: str, stage_name: str, stage_info: StageInfo):
         """
@@ -117,10 +202,117 @@ class TaskManager:
             stage_name: Name of the pipeline stage
             stage_info: StageInfo object with updated information
         """
-        with self.lock:
-            if task_id in self.tasks:
-                self.tasks[task_id].stages[stage_name] = stage_info
-                self.tasks[task_id].current_stage = stage_name
+        with self._lock_for(task_id):
+            task = self.tasks.get(task_id)
+            if task:
+                old = task.stages.get(stage_name)
+                task.progress_sum += stage_info.progress - (old.progress if old else 0.0)
+                task.stages[stage_name] = stage_info
+                task.current_stage = stage_name
+                task.version += 1
+
+    def begin_stage(self, task_id: str, stage_name: str) -> bool:
+        """
+        Start a pipeline stage unless cancellation was requested.
+
+        Checks the cancel flag and records the RUNNING stage under a single
+        lock acquisition. If the task was cancelled, it is marked CANCELLED
+        and no stage is recorded.
+
+        Args:
+            task_id: UUID of the task
+            stage_name: Name of the pipeline stage
+
+        Returns:
+            bool: False if the task was cancelled, True if the stage started
+        """
+        with self._lock_for(task_id):
+            task = self.tasks.get(task_id)
+            cancel_event = self.cancel_events.get(task_id)
+            if cancel_event is not None and cancel_event.is_set():
+                if task:
+                    task.status = TaskStatus.CANCELLED
+                    task.version += 1
+                return False
+
+            if task:
+                old = task.stages.get(stage_name)
+                if old:
+                    task.progress_sum -= old.progress
+                task.stages[stage_name] = StageInfo(
+                    name=stage_name,
+                    status=TaskStatus.RUNNING,
+                    progress=0.0,
+                    items_processed=0,
+                    items_total=0,
+                    tokens_used=0,
+                    start_time=time.monotonic_ns()
+                )
+                task.current_stage = stage_name
+                task.version += 1
+            return True
+
+    def patch_stage(self, task_id: str, stage_name: str,
+                    status: Optional[TaskStatus] = None,
+                    progress: Optional[float] = None,
+                    items_processed: Optional[int] = None,
+                    items_total: Optional[int] = None,
+                    tokens_used: Optional[int] = None,
+                    error: Optional[str] = None):
+        """
+        Update fields of a stage in place under a single lock acquisition.
+
+        Fields left as None are unchanged, so the start_time recorded by
+        begin_stage is kept. A COMPLETED or FAILED status also records the
+        stage end_time. A stage that was never begun is created. Progress-only
+        updates (no status) are dropped once the stage has finished.
+
+        Args:
+            task_id: UUID of the task
+            stage_name: Name of the pipeline stage
+            status: New stage status
+            progress: Progress from 0.0 to 1.0
+            items_processed: Number of items completed
+            items_total: Total number of items
+            tokens_used: Tokens used by this stage so far
+            error: Error message if any
+        """
+        with self._lock_for(task_id):
+            task = self.tasks.get(task_id)
+            if not task:
+                return
+
+            stage = task.stages.get(stage_name)
+            if stage is None:
+                stage = task.stages[stage_name] = StageInfo(
+                    name=stage_name,
+                    status=status or TaskStatus.RUNNING,
+                    progress=0.0,
+                    items_processed=0,
+                    items_total=0,
+                    tokens_used=0
+                )
+                task.current_stage = stage_name
+            elif status is None and stage.status is not TaskStatus.RUNNING:
+                return
+
+            task.version += 1
+            stage.view_cache = None
+            if status is not None:
+                stage.status = status
+                if status in _END_STATUSES:
+                    stage.end_time = time.monotonic_ns()
+            if progress is not None:
+                task.progress_sum += progress - stage.progress
+                stage.progress = progress
+            if items_processed is not None:
+                stage.items_processed = items_processed
+            if items_total is not None:
+                stage.items_total = items_total
+            if tokens_used is not None:
+                stage.tokens_used = tokens_used
+            if error is not None:
+                stage.error = error
 
     def update_tokens(self, task_id: str, prompt_tokens: int, completion_tokens: int):
         """
@@ -131,10 +323,29 @@ class TaskManager:
             prompt_tokens: Number of prompt tokens to add
             completion_tokens: Number of completion tokens to add
         """
-        with self.lock:
+        with self._lock_for(task_id):
             if task_id in self.tasks:
                 self.tasks[task_id].total_prompt_tokens += prompt_tokens
                 self.tasks[task_id].total_completion_tokens += completion_tokens
+                self.tasks[task_id].version += 1
+
+    def set_tokens(self, task_id: str, prompt_tokens: int, completion_tokens: int):
+        """
+        Set absolute token totals for a task.
+
+        Lets a pipeline keep running totals locally and publish them at a few
+        checkpoints instead of taking the lock after every stage.
+
+        Args:
+            task_id: UUID of the task
+            prompt_tokens: Total prompt tokens used so far
+            completion_tokens: Total completion tokens used so far
+        """
+        with self._lock_for(task_id):
+            if task_id in self.tasks:
+                self.tasks[task_id].total_prompt_tokens = prompt_tokens
+                self.tasks[task_id].total_completion_tokens = completion_tokens
+                self.tasks[task_id].version += 1
 
     def set_error(self, task_id: str, error_message: str):
         """
@@ -144,11 +355,12 @@ class TaskManager:
             task_id: UUID of the task
             error_message: Error description
         """
-        with self.lock:
+        with self._lock_for(task_id):
             if task_id in self.tasks:
                 self.tasks[task_id].error = error_message
                 self.tasks[task_id].status = TaskStatus.FAILED
-                self.tasks[task_id].completed_at = datetime.now()
+                self.tasks[task_id].completed_at = _task_now(self.tasks[task_id])
+                self.tasks[task_id].version += 1
 
     def store_result(self, task_id: str, result: Dict[str, Any]):
         """
@@ -158,21 +370,53 @@ class TaskManager:
             task_id: UUID of the task
             result: Dictionary containing pipeline results
         """
-        with self.lock:
+        with self._lock_for(task_id):
             self.results[task_id] = result
+        self._touch_result(task_id)
 
-    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+    def get_result(self, task_id: str, with_data: bool = True) -> Optional[Dict[str, Any]]:
         """
         Get stored results for a task.
 
         Args:
             task_id: UUID of the task
+            with_data: Include the bulky 'data' and 'extracted_questions' entries,
+                reloading them from disk if they were evicted from memory
 
         Returns:
-            Results dictionary or None if not found
+            Results dictionary or None if not found (or its saved data is gone)
         """
-        with self.lock:
-            return self.results.get(task_id)
+        result = self.results.get(task_id)
+        if result is None or not with_data:
+            return result
+
+        if "data" not in result:
+            try:
+                result = {**result, **{key: load_json(result[path_key])
+                                       for key, path_key in _RESULT_DATA_FILES.items()}}
+            except OSError:
+                return None
+            with self._lock_for(task_id):
+                if task_id not in self.results:
+                    return result
+                self.results[task_id] = result
+
+        self._touch_result(task_id)
+        return result
+
+    def _touch_result(self, task_id: str):
+        """Mark a result's data as most recently used and evict the data of the least recently used"""
+        with self._resident_lock:
+            self._resident_results[task_id] = None
+            self._resident_results.move_to_end(task_id)
+            while len(self._resident_results) > RESULT_CACHE_MAX_ENTRIES:
+                evicted_id, _ = self._resident_results.popitem(last=False)
+                with self._lock_for(evicted_id):
+                    evicted = self.results.get(evicted_id)
+                    # Only drop data that can be reloaded
+                    if evicted and all(path_key in evicted for path_key in _RESULT_DATA_FILES.values()):
+                        self.results[evicted_id] = {key: value for key, value in evicted.items()
+                                                    if key not in _RESULT_DATA_FILES}
 
     def calculate_progress(self, task_id: str) -> float:
         """
@@ -184,7 +428,7 @@ class TaskManager:
         Returns:
             float: Progress from 0.0 to 1.0
         """
-        with self.lock:
+        with self._lock_for(task_id):
             if task_id not in self.tasks:
                 return 0.0
 
@@ -193,20 +437,34 @@ class TaskManager:
                 return 0.0
 
             # Single-hop has 6 stages, multi-hop has 8 stages
-            num_stages = 8 if task.task_type == TaskType.MULTI_HOP else 6
-            total_progress = sum(stage.progress for stage in task.stages.values())
-            return total_progress / num_stages
+            num_stages = 8 if task.task_type is TaskType.MULTI_HOP else 6
+            return task.progress_sum / num_stages
 
     def request_cancel(self, task_id: str):
         """
         Request cancellation of a running task.
 
+        Sets the task's cancel event, which the pipeline checks at stage
+        boundaries and its components check as each LLM call completes.
+
         Args:
             task_id: UUID of the task to cancel
         """
-        with self.lock:
+        with self._lock_for(task_id):
             if task_id in self.tasks:
-                self.cancel_flags[task_id] = True
+                self.cancel_events[task_id].set()
+
+    def get_cancel_event(self, task_id: str) -> Optional[Event]:
+        """
+        Get the event that is set when cancellation of a task is requested.
+
+        Args:
+            task_id: UUID of the task
+
+        Returns:
+            threading.Event for the task, or None if not found
+        """
+        return self.cancel_events.get(task_id)
 
     def is_cancelled(self, task_id: str) -> bool:
         """
@@ -218,8 +476,22 @@ class TaskManager:
         Returns:
             bool: True if cancellation requested
         """
-        with self.lock:
-            return self.cancel_flags.get(task_id, False)
+        event = self.cancel_events.get(task_id)
+        return event is not None and event.is_set()
+
+    def delete_task(self, task_id: str):
+        """
+        Remove a task, its results and its cancel event from memory.
+
+        Args:
+            task_id: UUID of the task to delete
+        """
+        with self._resident_lock:
+            self._resident_results.pop(task_id, None)
+        with self._lock_for(task_id):
+            self.tasks.pop(task_id, None)
+            self.results.pop(task_id, None)
+            self.cancel_events.pop(task_id, None)
 
     def list_all_tasks(self) -> list:
         """
@@ -228,13 +500,17 @@ class TaskManager:
         Returns:
             list: List of task dictionaries with basic information
         """
-        with self.lock:
-            tasks_list = []
-            for task_id, task in self.tasks.items():
+        tasks_list = []
+        # list() copies the items in one GIL-atomic step, so tasks created or
+        # deleted meanwhile cannot break the iteration. self.tasks only gains
+        # entries in create_task, so it is in creation order and walking it
+        # backwards yields newest first without sorting.
+        for task_id, task in reversed(list(self.tasks.items())):
+            with self._lock_for(task_id):
                 # Calculate progress - single-hop has 6 stages, multi-hop has 8
                 if task.stages:
-                    num_stages = 8 if task.task_type == TaskType.MULTI_HOP else 6
-                    progress = sum(stage.progress for stage in task.stages.values()) / num_stages
+                    num_stages = 8 if task.task_type is TaskType.MULTI_HOP else 6
+                    progress = task.progress_sum / num_stages
                 else:
                     progress = 0.0
 
@@ -250,10 +526,7 @@ class TaskManager:
                     "error": task.error
                 })
 
-            # Sort by created_at, newest first
-            tasks_list.sort(key=lambda x: x["created_at"], reverse=True)
-            return tasks_list
-
+        return tasks_list
 
 # Global task manager instance
 task_manager = TaskManager()
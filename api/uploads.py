@@ -0,0 +1,83 @@
+"""
+Helpers for receiving and saving uploaded files.
+"""
+import os
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+# Largest accepted upload, in bytes (default 100 MiB)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Bytes read from the upload per iteration
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Allowance for the multipart boundaries and part headers around the file
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large_detail() -> str:
+    """Error message for a rejected upload"""
+    return f"File exceeds the maximum upload size of {UPLOAD_MAX_BYTES} bytes"
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject uploads whose declared Content-Length is over the limit before the body is read.
+
+    The multipart form is parsed, and spooled to memory or a temp file, before
+    the route handler runs, so save_upload alone cannot stop a large body from
+    being received. Requests without a Content-Length (chunked) pass through
+    and are still bounded on disk by save_upload.
+
+    Args:
+        app: ASGI application to wrap
+        paths: Request paths of the upload endpoints
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths:
+            content_length = Headers(scope=scope).get("content-length", "")
+            if content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD:
+                response = JSONResponse({"detail": _too_large_detail()}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+async def save_upload(file: UploadFile, dest: Path):
+    """
+    Copy an uploaded file to disk in fixed-size chunks.
+
+    Memory use is one chunk regardless of the file size. The size limit is
+    checked as chunks are copied, which limits what is written to dest; the
+    request body has already been received by then (UploadSizeLimitMiddleware
+    rejects oversize bodies up front when their length is declared).
+
+    Args:
+        file: Uploaded file from the request
+        dest: Path to write the file to
+
+    Raises:
+        HTTPException: 413 if the upload is larger than UPLOAD_MAX_BYTES
+    """
+    written = 0
+    with open(dest, "wb") as buffer:
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > UPLOAD_MAX_BYTES:
+                break
+            buffer.write(chunk)
+
+    if written > UPLOAD_MAX_BYTES:
+        os.remove(dest)
+        raise HTTPException(
+            status_code=413,
+            detail=_too_large_detail()
+        )
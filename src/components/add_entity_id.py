@@ -26,6 +26,76 @@ class AddEntityId:
         else:
             raise EnvironmentError("Environment variables are not defined correctly")
 
+        # Entity ID counter (global across all inputs)
+        self.entity_id_beg = 0
+        self.processed_count = 0
+
+    def add_ids(self, cur_input):
+        """
+        Assign entity IDs to one input in place and link its relationships.
+
+        IDs continue from self.entity_id_beg, so calling this on inputs in
+        order gives the same IDs as run(). Lets a caller number inputs as
+        they become ready instead of waiting for the whole list.
+
+        Args:
+            cur_input (dict): Input with 'entity' and 'relationship' lists.
+        """
+        # Filter and validate entities
+        filtered_entities = []
+
+        # Skip if current input has no entities
+        if "entity" not in cur_input:
+            return
+
+        # Filter entities to only include those with both name and description
+        for entity in cur_input['entity']:
+            if "entity_name" in entity and "entity_description" in entity:
+                filtered_entities.append(entity)
+
+        # Create mapping from entity name to entity ID
+        entity_name_to_id = {}
+
+        # Assign unique IDs to each entity
+        for cur_entity in filtered_entities:
+            # Only assign new ID if entity doesn't already have one
+            if "entity_id" not in cur_entity:
+                cur_entity["entity_id"] = self.entity_id_beg
+
+            # Store entity name to ID mapping for relationship processing
+            entity_name_to_id[cur_entity["entity_name"]] = cur_entity["entity_id"]
+
+            # Increment global entity ID counter
+            self.entity_id_beg += 1
+
+        # Update input with filtered entities
+        cur_input['entity'] = filtered_entities
+
+        # Filter relationships to only include those with valid entities
+        filter_relationships = []
+        for cur_relationship in cur_input['relationship']:
+            # Extract source and target entity names
+            source_entity_name = cur_relationship['source_entity_name']
+            target_entity_name = cur_relationship['target_entity_name']
+
+            # Only keep relationships where both entities exist in our entity list
+            if source_entity_name in entity_name_to_id and target_entity_name in entity_name_to_id:
+                filter_relationships.append(cur_relationship)
+
+        # Add entity IDs to each relationship
+        for cur_relationship in filter_relationships:
+            # Get entity names from relationship
+            source_entity_name = cur_relationship['source_entity_name']
+            target_entity_name = cur_relationship['target_entity_name']
+
+            # Add source and target entity IDs using the mapping
+            cur_relationship['source_entity_id'] = entity_name_to_id[source_entity_name]
+            cur_relationship['target_entity_id'] = entity_name_to_id[target_entity_name]
+
+        # Update input with filtered relationships
+        cur_input['relationship'] = filter_relationships
+        self.processed_count += 1
+
     def run(self, inputs=None):
         # Determine if we're in direct mode (inputs provided)
         direct_mode = inputs is not None
@@ -38,80 +108,27 @@ class AddEntityId:
             # Make a deep copy to avoid modifying the original input
             inputs = copy.deepcopy(inputs)
 
-        # Initialize entity ID counter (global across all inputs)
-        entity_id_beg = 0
-        processed_count = 0
+        # Reset the entity ID counter (global across all inputs)
+        self.entity_id_beg = 0
+        self.processed_count = 0
 
         # Process each input document
         for cur_input in inputs:
-            # Filter and validate entities
-            filtered_entities = []
-
-            # Skip if current input has no entities
-            if "entity" not in cur_input:
-                continue
-
-            # Filter entities to only include those with both name and description
-            for entity in cur_input['entity']:
-                if "entity_name" in entity and "entity_description" in entity:
-                    filtered_entities.append(entity)
-
-            # Create mapping from entity name to entity ID
-            entity_name_to_id = {}
-
-            # Assign unique IDs to each entity
-            for cur_entity in filtered_entities:
-                # Only assign new ID if entity doesn't already have one
-                if "entity_id" not in cur_entity:
-                    cur_entity["entity_id"] = entity_id_beg
-
-                # Store entity name to ID mapping for relationship processing
-                entity_name_to_id[cur_entity["entity_name"]] = cur_entity["entity_id"]
-
-                # Increment global entity ID counter
-                entity_id_beg += 1
-
-            # Update input with filtered entities
-            cur_input['entity'] = filtered_entities
-
-            # Filter relationships to only include those with valid entities
-            filter_relationships = []
-            for cur_relationship in cur_input['relationship']:
-                # Extract source and target entity names
-                source_entity_name = cur_relationship['source_entity_name']
-                target_entity_name = cur_relationship['target_entity_name']
-
-                # Only keep relationships where both entities exist in our entity list
-                if source_entity_name in entity_name_to_id and target_entity_name in entity_name_to_id:
-                    filter_relationships.append(cur_relationship)
-
-            # Add entity IDs to each relationship
-            for cur_relationship in filter_relationships:
-                # Get entity names from relationship
-                source_entity_name = cur_relationship['source_entity_name']
-                target_entity_name = cur_relationship['target_entity_name']
-
-                # Add source and target entity IDs using the mapping
-                cur_relationship['source_entity_id'] = entity_name_to_id[source_entity_name]
-                cur_relationship['target_entity_id'] = entity_name_to_id[target_entity_name]
-
-            # Update input with filtered relationships
-            cur_input['relationship'] = filter_relationships
-            processed_count += 1
+            self.add_ids(cur_input)
 
         # Only save if not in direct mode
         if not direct_mode:
-            info(f'Saving {processed_count} processed entries to {os.path.relpath(self.ADD_ENTITY_ID_OUTPUT_PATH, PROJECT_ROOT)}.')
+            info(f'Saving {self.processed_count} processed entries to {os.path.relpath(self.ADD_ENTITY_ID_OUTPUT_PATH, PROJECT_ROOT)}.')
             save_json(inputs, self.ADD_ENTITY_ID_OUTPUT_PATH)
 
-        info(f"Completed: {processed_count} entries processed, {entity_id_beg} unique entity IDs assigned")
+        info(f"Completed: {self.processed_count} entries processed, {self.entity_id_beg} unique entity IDs assigned")
 
         if direct_mode:
             # In direct mode, return the processed inputs along with stats
-            return inputs, processed_count, entity_id_beg
+            return inputs, self.processed_count, self.entity_id_beg
         else:
             # Return total entities processed and total IDs assigned
-            return processed_count, entity_id_beg
+            return self.processed_count, self.entity_id_beg
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ import re
 import threading
 from tqdm import tqdm
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 
 from src.utils.rag_utils import list_to_numbered_string, expand_numbers_and_ranges
 from src.utils.file_utils import read_text_file, save_json, load_json
@@ -17,7 +17,7 @@ class AnswerEvaluator:
     A class to evaluate answers based on various criteria such as relevance,
     semantic similarity, inferability, and practicality.
     """
-    def __init__(self):
+    def __init__(self, config=None, progress=None, cancel_event=None):
 
         if os.getenv("ANSWER_EVALUATOR_CONTENT_INPUT_PATH", None) is not None:
             self.ANSWER_EVALUATOR_INPUT_PATH = os.path.join(PROJECT_ROOT, os.getenv("ANSWER_EVALUATOR_CONTENT_INPUT_PATH"))
@@ -37,11 +37,20 @@ class AnswerEvaluator:
         self.PRACTICALITY_PROMPT = read_text_file(os.path.join(PROJECT_ROOT, os.getenv("ANSWER_EVALUATOR_PRACTICALITY_PROMPT_PATH")))
 
         # Load optional configuration parameters
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
-        self.SAVE_INTERVAL = float(os.getenv("SAVE_INTERVAL", 10))
+        if config is not None:
+            self.TEMPERATURE = config.TEMPERATURE
+            self.SAVE_INTERVAL = config.SAVE_INTERVAL
+        else:
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+            self.SAVE_INTERVAL = float(os.getenv("SAVE_INTERVAL", 10))
         self.ANSWER_EVALUATOR_NUM_WORKERS = int(os.getenv("ANSWER_EVALUATOR_NUM_WORKERS", 4))
         self.ANSWER_EVALUATOR_MAX_GEN_TIMES = int(os.getenv("ANSWER_EVALUATOR_MAX_GEN_TIMES", -1))
 
+        self.progress = progress
+        self.cancel_event = cancel_event
+        # Set by the caller to abandon a run whose results are no longer wanted
+        self.stop_event = threading.Event()
+
         # Initialize token usage tracker
         self.total_prompt_tokens = 0
         self.total_completion_tokens = 0
@@ -68,12 +77,18 @@ class AnswerEvaluator:
         except Exception:
             return None, None  
 
+    def has_score(self, text):
+        """
+        Whether a judge response parses into a score; only such responses are cached.
+        """
+        return self.extract_reasoning_and_score(text)[1] is not None
+
     def score_relevance(self, answer, question):
         """
         Scores the RAG's answer based on the Relevance criterion.
         """
         cur_prompt = self.RELEVANCE_PROMPT.format(question=question, answer=answer)
-        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE)
+        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE, validate=self.has_score)
         return generator_response, prompt_tokens, completion_tokens
 
     def score_inferability(self, answer, clues, question):
@@ -84,7 +99,7 @@ class AnswerEvaluator:
         # Clues are the objective facts that the answer should be inferable from
         cur_prompt = self.INFERABILITY_PROMPT.format(question=question, answer=answer, clues=clues)
         # Call the Qwen API to evaluate if the answer can be reasonably inferred from the clues
-        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE)
+        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE, validate=self.has_score)
         # Return the evaluation response and token usage statistics
         return generator_response, prompt_tokens, completion_tokens
 
@@ -95,7 +110,7 @@ class AnswerEvaluator:
         # Format the practicality prompt template with the question and answer
         cur_prompt = self.PRACTICALITY_PROMPT.format(question=question, answer=answer)
         # Call the Qwen API to evaluate the practical value/usefulness of the question
-        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE)
+        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE, validate=self.has_score)
         # Return the practicality evaluation and token counts
         return generator_response, prompt_tokens, completion_tokens
 
@@ -106,10 +121,22 @@ class AnswerEvaluator:
         # Format the semantic similarity prompt template with question and clues
         cur_prompt = self.SEMANTIC_SIMILARITY_PROMPT.format(question=question, clues=clues)
         # Call the Qwen API to evaluate how semantically similar the question is to the provided clues
-        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE)
+        generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_prompt, temperature=self.TEMPERATURE, validate=self.has_score)
         # Return the similarity evaluation and token usage information
         return generator_response, prompt_tokens, completion_tokens
 
+    def submit_score(self, executor, pending_scores, score_fn, *args):
+        """
+        Submit a scoring call, reusing the future of an identical call already
+        submitted in this run (same scorer and same arguments, hence the same
+        prompt), so duplicate prompts cost one LLM call.
+        """
+        key = (score_fn.__name__, *args)
+        future = pending_scores.get(key)
+        if future is None:
+            future = pending_scores[key] = executor.submit(score_fn, *args)
+        return future
+
     def process_file_content(self, data=None, direct_mode=False):
         """
         Process content-based files for answer evaluation.
@@ -137,7 +164,8 @@ class AnswerEvaluator:
         all_num, new_gen_num = 0, 0 # Initialize counters: all_num = total tasks, new_gen_num = newly processed tasks
 
         with ThreadPoolExecutor(max_workers=self.ANSWER_EVALUATOR_NUM_WORKERS) as executor:
-            futures_to_data = {} # Dictionary to map Future objects to their associated data
+            futures_to_data = {} # Dictionary to map Future objects to the list of targets waiting on them
+            pending_scores = {} # Identical scoring requests share one future
             for cur_dict in data[:answer_evaluator_max_gen_times]: 
 
                 """calculate generation metrics"""
@@ -163,7 +191,8 @@ class AnswerEvaluator:
 
                     # Find all answer keys in this question (e.g., "answer", "rag-answer")
                     # Exclude keys that contain 'score' or 'reason' (those are evaluation results)
-                    answer_keys = [key for key in question_dict.keys() if 'answer' in key and 'score' not in key and 'reason' not in key]
+                    # Snapshot the keys first: FinalAnswerGenerator may add keys to this dict concurrently
+                    answer_keys = [key for key in list(question_dict) if 'answer' in key and 'score' not in key and 'reason' not in key]
 
                     # For each answer, check if it needs to be scored
                     for answer_key in answer_keys:
@@ -180,58 +209,67 @@ class AnswerEvaluator:
                         # Relevance Score: only evaluate if not already scored
                         if relevance_score_key_name not in question_dict or question_dict[relevance_score_key_name] == None:
                             # Submit the scoring task to the thread pool for parallel execution
-                            future = executor.submit(self.score_relevance, answer, question)
+                            future = self.submit_score(executor, pending_scores, self.score_relevance, answer, question)
                             # Store metadata to identify this task when it completes
-                            futures_to_data[future] = (question_dict, answer_key, 'relevance')
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'relevance'))
 
                         # Semantic Similarity Score: only evaluate if not already scored
                         semantic_similarity_score_key_name = f"{answer_key}-semantic-similarity-score"
                         if semantic_similarity_score_key_name not in question_dict or question_dict[semantic_similarity_score_key_name] == None:
-                            future = executor.submit(self.score_semantic_similarity, clues_str, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'semantic-similarity')
+                            future = self.submit_score(executor, pending_scores, self.score_semantic_similarity, clues_str, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'semantic-similarity'))
 
                         # Inferability Score: only evaluate if not already scored
                         inferability_score_key_name = f"{answer_key}-inferability-score"
                         if inferability_score_key_name not in question_dict or question_dict[inferability_score_key_name] == None:
-                            future = executor.submit(self.score_inferability, answer, clues_str, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'inferability')
+                            future = self.submit_score(executor, pending_scores, self.score_inferability, answer, clues_str, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'inferability'))
 
                         # Practicality Score: only evaluate if not already scored
                         practicality_score_key_name = f"{answer_key}-practicality-score"
                         if practicality_score_key_name not in question_dict or question_dict[practicality_score_key_name] == None:
-                            future = executor.submit(self.score_practicality, answer, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'practicality')
+                            future = self.submit_score(executor, pending_scores, self.score_practicality, answer, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'practicality'))
 
-            # Count total number of scoring tasks submitted
-            all_num = len(futures_to_data)
+            # Count total number of scoring tasks submitted (a coalesced call counts once per target)
+            all_num = sum(len(targets) for targets in futures_to_data.values())
+            if self.progress is not None:
+                self.progress.set_total(all_num)
             for future in tqdm(as_completed(futures_to_data), total=len(futures_to_data), desc="Evaluating...", dynamic_ncols=True):
-                question_dict, answer_key, score_type = futures_to_data[future] # Retrieve the metadata associated with this future
+                if self.stop_event.is_set() or (self.cancel_event is not None and self.cancel_event.is_set()):
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise CancelledError()
+                targets = futures_to_data[future] # Retrieve every (question_dict, answer_key, score_type) waiting on this future
+                if self.progress is not None:
+                    self.progress.increment(len(targets))
                 try:
                     score_response, prompt_tokens, completion_tokens = future.result(timeout=10*60) # Get the result from the completed future with a 10-minute timeout
 
                     with self.token_lock:
                         self.total_prompt_tokens += prompt_tokens
                         self.total_completion_tokens += completion_tokens
- 
+
                     reason, score = self.extract_reasoning_and_score(score_response) # Parse the LLM response to extract reasoning and numeric score
-                    # Construct the keys where results will be stored in the data structure
-                    score_key_name = f"{answer_key}-{score_type}-score"
-                    reason_key_name = f"{answer_key}-{score_type}-reason"
-
-                    # Store the reasoning and score in the question dictionary
-                    question_dict[reason_key_name] = reason
-                    question_dict[score_key_name] = score
-
-                    # Increment the counter of newly processed tasks
-                    new_gen_num += 1
-                    # Periodically save progress to avoid losing work if the process crashes
-                    if not direct_mode and (new_gen_num + 1) % self.save_interval == 0:
-                        info(f"Saving results to {os.path.relpath(self.ANSWER_EVALUATOR_OUTPUT_PATH, PROJECT_ROOT)}")
-                        save_json(data, self.ANSWER_EVALUATOR_OUTPUT_PATH)
-                        info(f"Processed {new_gen_num}/{all_num} scoring tasks.")
+                    for question_dict, answer_key, score_type in targets:
+                        # Construct the keys where results will be stored in the data structure
+                        score_key_name = f"{answer_key}-{score_type}-score"
+                        reason_key_name = f"{answer_key}-{score_type}-reason"
+
+                        # Store the reasoning and score in the question dictionary
+                        question_dict[reason_key_name] = reason
+                        question_dict[score_key_name] = score
+
+                        # Increment the counter of newly processed tasks
+                        new_gen_num += 1
+                        # Periodically save progress to avoid losing work if the process crashes
+                        if not direct_mode and (new_gen_num + 1) % self.SAVE_INTERVAL == 0:
+                            info(f"Saving results to {os.path.relpath(self.ANSWER_EVALUATOR_OUTPUT_PATH, PROJECT_ROOT)}")
+                            save_json(data, self.ANSWER_EVALUATOR_OUTPUT_PATH)
+                            info(f"Processed {new_gen_num}/{all_num} scoring tasks.")
 
                 except Exception as e:
                     # Log the error and continue processing other futures
+                    _, answer_key, score_type = targets[0]
                     error(f"Error processing {score_type} for answer_key {answer_key}: {e}")
                     continue
 
@@ -282,7 +320,8 @@ class AnswerEvaluator:
         all_num, new_gen_num = 0, 0
         with ThreadPoolExecutor(max_workers=self.ANSWER_EVALUATOR_NUM_WORKERS) as executor:
             
-            futures_to_data = {} # Dictionary to map Future objects to their associated data
+            futures_to_data = {} # Dictionary to map Future objects to the list of targets waiting on them
+            pending_scores = {} # Identical scoring requests share one future
             # Iterate through entities up to the specified limit
             # Note: data is a dict, so we convert items() to a list before slicing
             for entity_id, entity_dict in list(data.items())[:answer_evaluator_max_gen_times]:
@@ -318,7 +357,8 @@ class AnswerEvaluator:
 
                     # Find all answer keys in this question (e.g., "answer", "rag-answer")
                     # Exclude keys that contain 'score' or 'reason' (those are evaluation results)
-                    answer_keys = [key for key in question_dict.keys() if 'answer' in key and 'score' not in key and 'reason' not in key]
+                    # Snapshot the keys first: FinalAnswerGenerator may add keys to this dict concurrently
+                    answer_keys = [key for key in list(question_dict) if 'answer' in key and 'score' not in key and 'reason' not in key]
                     # For each answer, check if it needs to be scored
                     for answer_key in answer_keys:
                         # Get the answer text
@@ -334,31 +374,39 @@ class AnswerEvaluator:
                         # Relevance Score: only evaluate if not already scored
                         if relevance_score_key_name not in question_dict or question_dict[relevance_score_key_name] == None:
                             # Submit the scoring task to the thread pool for parallel execution
-                            future = executor.submit(self.score_relevance, answer, question)
+                            future = self.submit_score(executor, pending_scores, self.score_relevance, answer, question)
                             # Store metadata to identify this task when it completes
-                            futures_to_data[future] = (question_dict, answer_key, 'relevance')
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'relevance'))
 
                         # Semantic Similarity Score: only evaluate if not already scored
                         semantic_similarity_score_key_name = f"{answer_key}-semantic-similarity-score"
                         if semantic_similarity_score_key_name not in question_dict or question_dict[semantic_similarity_score_key_name] == None:
-                            future = executor.submit(self.score_semantic_similarity, clues_str, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'semantic-similarity')
+                            future = self.submit_score(executor, pending_scores, self.score_semantic_similarity, clues_str, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'semantic-similarity'))
 
                         # Inferability Score: only evaluate if not already scored
                         inferability_score_key_name = f"{answer_key}-inferability-score"
                         if inferability_score_key_name not in question_dict or question_dict[inferability_score_key_name] == None:
-                            future = executor.submit(self.score_inferability, answer, clues_str, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'inferability')
+                            future = self.submit_score(executor, pending_scores, self.score_inferability, answer, clues_str, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'inferability'))
 
                         # Practicality Score: only evaluate if not already scored
                         practicality_score_key_name = f"{answer_key}-practicality-score"
                         if practicality_score_key_name not in question_dict or question_dict[practicality_score_key_name] == None:
-                            future = executor.submit(self.score_practicality, answer, question)
-                            futures_to_data[future] = (question_dict, answer_key, 'practicality')
+                            future = self.submit_score(executor, pending_scores, self.score_practicality, answer, question)
+                            futures_to_data.setdefault(future, []).append((question_dict, answer_key, 'practicality'))
 
-            all_num = len(futures_to_data)
+            # Count total number of scoring tasks submitted (a coalesced call counts once per target)
+            all_num = sum(len(targets) for targets in futures_to_data.values())
+            if self.progress is not None:
+                self.progress.set_total(all_num)
             for future in tqdm(as_completed(futures_to_data), total=len(futures_to_data), desc="Evaluating...", dynamic_ncols=True):
-                question_dict, answer_key, score_type = futures_to_data[future] # Retrieve the metadata associated with this future
+                if self.stop_event.is_set() or (self.cancel_event is not None and self.cancel_event.is_set()):
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise CancelledError()
+                targets = futures_to_data[future] # Retrieve every (question_dict, answer_key, score_type) waiting on this future
+                if self.progress is not None:
+                    self.progress.increment(len(targets))
                 try:
                     score_response, prompt_tokens, completion_tokens = future.result(timeout=10*60) # Get the result from the completed future with a 10-minute timeout
 
@@ -366,26 +414,27 @@ class AnswerEvaluator:
                         self.total_prompt_tokens += prompt_tokens
                         self.total_completion_tokens += completion_tokens
 
-                    
                     reason, score = self.extract_reasoning_and_score(score_response) # Parse the LLM response to extract reasoning and numeric score
-                    # Construct the keys where results will be stored in the data structure
-                    score_key_name = f"{answer_key}-{score_type}-score"
-                    reason_key_name = f"{answer_key}-{score_type}-reason"
-
-                    # Store the reasoning and score in the question dictionary
-                    question_dict[reason_key_name] = reason
-                    question_dict[score_key_name] = score
-
-                    # Increment the counter of newly processed tasks
-                    new_gen_num += 1
-                    # Periodically save progress to avoid losing work if the process crashes
-                    if not direct_mode and (new_gen_num + 1) % self.save_interval == 0:
-                        info(f"Saving results to {os.path.relpath(self.ANSWER_EVALUATOR_OUTPUT_PATH, PROJECT_ROOT)}")
-                        save_json(data, self.ANSWER_EVALUATOR_OUTPUT_PATH)
-                        info(f"Processed {new_gen_num}/{all_num} scoring tasks.")
+                    for question_dict, answer_key, score_type in targets:
+                        # Construct the keys where results will be stored in the data structure
+                        score_key_name = f"{answer_key}-{score_type}-score"
+                        reason_key_name = f"{answer_key}-{score_type}-reason"
+
+                        # Store the reasoning and score in the question dictionary
+                        question_dict[reason_key_name] = reason
+                        question_dict[score_key_name] = score
+
+                        # Increment the counter of newly processed tasks
+                        new_gen_num += 1
+                        # Periodically save progress to avoid losing work if the process crashes
+                        if not direct_mode and (new_gen_num + 1) % self.SAVE_INTERVAL == 0:
+                            info(f"Saving results to {os.path.relpath(self.ANSWER_EVALUATOR_OUTPUT_PATH, PROJECT_ROOT)}")
+                            save_json(data, self.ANSWER_EVALUATOR_OUTPUT_PATH)
+                            info(f"Processed {new_gen_num}/{all_num} scoring tasks.")
 
                 except Exception as e:
                     # Log the error and continue processing other futures
+                    _, answer_key, score_type = targets[0]
                     error(f"Error processing {score_type} for answer_key {answer_key}: {e}")
                     continue
 
@@ -2,20 +2,20 @@ import os
 import random
 import json
 import copy
+from functools import partial
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from tqdm import tqdm
 import numpy as np
-from sklearn.cluster import DBSCAN
 from collections import defaultdict
-from sklearn.metrics.pairwise import cosine_similarity
 
 from src import PROJECT_ROOT
 from src.utils.api_utils import call_api_qwen, get_qwen_embeddings
+from src.utils.file_utils import load_json, save_json
 from src.utils.logger import info, error, warning
 
 class EntityEliminator:
-    def __init__(self):
+    def __init__(self, config=None):
         self.ENTITY_ELIMINATOR_INPUT_PATH = None
         self.ENTITY_ELIMINATOR_OUTPUT_PATH = None
         self.ENTITY_ELIMINATOR_OUTPUT_MAP_PATH = None
@@ -31,15 +31,28 @@ class EntityEliminator:
         else:
             raise EnvironmentError("Environment variable 'ENTITY_ELIMINATOR_INPUT_PATH' is not set.")
         
-        self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
-        self.ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD = float(os.getenv("ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD",0.8))
+        if config is not None:
+            self.NUM_WORKERS = config.NUM_WORKERS
+            self.TEMPERATURE = config.TEMPERATURE
+            self.ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD = config.ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD
+        else:
+            self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+            self.ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD = float(os.getenv("ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD",0.8))
+
+        # Embedding size requested from the API (text-embedding-v4 supports 64-2048)
+        self.ENTITY_ELIMINATOR_EMBEDDING_DIM = int(os.getenv("ENTITY_ELIMINATOR_EMBEDDING_DIM", 1024))
 
         # Token tracking
         self.total_prompt_tokens = 0
         self.total_completion_tokens = 0
         self.token_lock = threading.Lock()
 
+        # Pool for the chunk-level LLM calls, created per run. During run() every
+        # conflict resolution call goes through it and group-level workers only
+        # wait on it, so at most NUM_WORKERS calls are in flight.
+        self.chunk_executor = None
+
     def extract_largest_json(self, response):
         """
         Extract the largest valid JSON object from a string response using a stack-based approach.
@@ -120,6 +133,22 @@ class EntityEliminator:
 
         return largest_json
     
+    def resolves_all_ids(self, response, all_entity_ids, dedupe=False):
+        """
+        Whether a conflict-resolution response parses and covers exactly the given entity ids.
+
+        Passed to call_api_qwen as `validate`, so responses the retry loop would
+        reject are never cached. `dedupe` mirrors the same-name loop, which
+        ignores repeated ids in the response.
+        """
+        try:
+            generated_entity_ids = [entity_id for resolved in self.extract_largest_json(response.strip()) for entity_id in resolved["entity_ids"]]
+        except Exception:
+            return False
+        if dedupe:
+            generated_entity_ids = set(generated_entity_ids)
+        return sorted(generated_entity_ids) == sorted(all_entity_ids)
+
     def group_entities_by_name(self, all_entities):
         """
         Group entities by their `entity_name`.
@@ -167,7 +196,7 @@ class EntityEliminator:
             while attempt < max_attempts:
                 attempt += 1
                 try:
-                    response, prompt_tokens, completion_tokens = call_api_qwen(prompt, temperature=self.TEMPERATURE)
+                    response, prompt_tokens, completion_tokens = call_api_qwen(prompt, temperature=self.TEMPERATURE, validate=partial(self.resolves_all_ids, all_entity_ids=all_entity_ids, dedupe=True))
 
                     # Track tokens with thread safety
                     with self.token_lock:
@@ -220,6 +249,24 @@ class EntityEliminator:
                 for entity in entity_group
             ]
 
+    def resolve_chunks(self, resolve_chunk, chunks):
+        """
+        Resolve the chunks of one merge round concurrently on the shared chunk pool.
+
+        Outside run() there is no pool, so the chunks are resolved one by one
+        on the calling thread.
+
+        Args:
+            resolve_chunk (callable): Function resolving a single chunk of entities.
+            chunks (list of list): Chunks of entities to resolve.
+
+        Returns:
+            list: Resolved chunks, in the same order as `chunks`.
+        """
+        if self.chunk_executor is None:
+            return list(map(resolve_chunk, chunks))
+        return list(self.chunk_executor.map(resolve_chunk, chunks))
+
     def resolve_conflicts_in_large_group_with_same_name(self, entity_name, all_entities, max_chunk_size=10, max_attempts=2):
         """
         Resolve conflicts in large groups by processing in chunks and iteratively merging until no further merges occur.
@@ -244,8 +291,8 @@ class EntityEliminator:
 
             chunks = [entities_to_process[i:i + max_chunk_size] for i in range(0, len(entities_to_process), max_chunk_size)]
             resolved_entities = []
-            for chunk in chunks:
-                resolved_chunk = self.resolve_single_conflict_with_same_name(entity_name, chunk)
+            resolved_chunks = self.resolve_chunks(partial(self.resolve_single_conflict_with_same_name, entity_name), chunks)
+            for resolved_chunk in resolved_chunks:
                 for resolved_entity in resolved_chunk:
                     smallest_entity_id = min(resolved_entity["entity_ids"])
                     for entity_id in resolved_entity["entity_ids"]:
@@ -328,46 +375,69 @@ class EntityEliminator:
             all_entities (list of dict): List of entities with 'entity_description' keys.
 
         Returns:
-            dict: Dictionary where keys are entity indices and values are embedding vectors.
+            numpy.ndarray: float32 matrix of shape (n, dim), rows L2-normalized.
         """
         descriptions = [entity['entity_description'] for entity in all_entities]
 
         # Batch the embeddings requests to avoid exceeding the API limit of 10 per batch
         batch_size = 10
-        all_embeddings = []
+        vectors = np.zeros((len(descriptions), self.ENTITY_ELIMINATOR_EMBEDDING_DIM), dtype=np.float32)
 
         for i in range(0, len(descriptions), batch_size):
             batch = descriptions[i:i + batch_size]
-            batch_embeddings, _ = get_qwen_embeddings(batch)
-            all_embeddings.extend(batch_embeddings)
+            batch_embeddings, _ = get_qwen_embeddings(batch, dim=self.ENTITY_ELIMINATOR_EMBEDDING_DIM)
+            vectors[i:i + len(batch_embeddings)] = batch_embeddings
 
-        return np.array(all_embeddings)
+        # Normalize once so cosine similarity becomes a plain dot product
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
 
-    def cluster_entities(self, all_entities, similarity_matrix, threshold):
+    def cluster_entities(self, all_entities, vectors, threshold, block_size=1024):
         """
-        Cluster entities based on similarity matrix using DBSCAN.
-        
+        Cluster entities whose cosine similarity reaches the threshold.
+
+        Clusters are the connected components of the "similarity >= threshold"
+        graph, which is what DBSCAN with min_samples=1 and eps=1-threshold
+        produced. Similarities are computed as one matmul per block of rows,
+        so the full n x n matrix is never held in memory.
+
         Args:
             all_entities (list): List of entities.
-            similarity_matrix (numpy.ndarray): Precomputed similarity matrix.
+            vectors (numpy.ndarray): L2-normalized embeddings, one row per entity.
             threshold (float): Similarity threshold for clustering.
-        
+            block_size (int): Number of rows compared per matmul.
+
         Returns:
             list: A list of clusters, where each cluster is a list of entity indices.
         """
-        # Transform similarity matrix to distance matrix (1 - similarity)
-        distance_matrix = 1 - similarity_matrix
+        n = len(vectors)
+        parent = np.arange(n)
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for start in range(0, n, block_size):
+            # Only compare against later rows; the matrix is symmetric
+            similarities = vectors[start:start + block_size] @ vectors[start:].T
+            rows, cols = np.nonzero(similarities >= threshold)
+            for row, col in zip((rows + start).tolist(), (cols + start).tolist()):
+                if row >= col:
+                    continue
+                root_row, root_col = find(row), find(col)
+                if root_row != root_col:
+                    parent[max(root_row, root_col)] = min(root_row, root_col)
 
-        # DBSCAN clustering with a minimum similarity threshold
-        clustering = DBSCAN(eps=1-threshold, min_samples=1, metric="precomputed")
-        labels = clustering.fit_predict(distance_matrix)
+        # Group indices by their root, in order of first appearance
+        clusters = {}
+        for idx in range(n):
+            clusters.setdefault(find(idx), []).append(idx)
 
-        # Group indices by cluster labels
-        clusters = [[] for _ in range(max(labels) + 1)]
-        for idx, label in enumerate(labels):
-            clusters[label].append(idx)
-        
-        return clusters
+        return list(clusters.values())
 
     def resolve_single_conflict_with_different_name(self, entity_group, max_attempts=3):
         """
@@ -402,7 +472,7 @@ class EntityEliminator:
             while attampt < max_attempts:
                 attampt += 1
                 try:
-                    response, prompt_tokens, completion_tokens = call_api_qwen(prompt, temperature=self.TEMPERATURE)
+                    response, prompt_tokens, completion_tokens = call_api_qwen(prompt, temperature=self.TEMPERATURE, validate=partial(self.resolves_all_ids, all_entity_ids=all_entity_ids))
 
                     # Track tokens with thread safety
                     with self.token_lock:
@@ -474,12 +544,12 @@ class EntityEliminator:
             # Process in chunk, max chunk size is set to 10 in this case
             chunks = [entities_to_process[i:i + max_chunk_size] for i in range(0, len(entities_to_process), max_chunk_size)] 
             resolved_entities = []
-            for chunk in chunks:
-                # use llm to resolve each chunk, the prompt criteria is:
-                # 1. If the descriptions convey the same meaning, merge them into a single entity and assign it a single consistent name.
-                # 2. If the descriptions convey different meanings, generate more specific names and descriptions for each distinct entity. Ensure that the more specific names clearly reflect the different meanings.
-                # 3. You must not skip the processing of any entity.
-                resolved_chunk = self.resolve_single_conflict_with_different_name(chunk)
+            # use llm to resolve each chunk, the prompt criteria is:
+            # 1. If the descriptions convey the same meaning, merge them into a single entity and assign it a single consistent name.
+            # 2. If the descriptions convey different meanings, generate more specific names and descriptions for each distinct entity. Ensure that the more specific names clearly reflect the different meanings.
+            # 3. You must not skip the processing of any entity.
+            resolved_chunks = self.resolve_chunks(self.resolve_single_conflict_with_different_name, chunks)
+            for resolved_chunk in resolved_chunks:
                 for resolved_entity in resolved_chunk:
                 # Fallback if fail: Map all entities in the cluster to their original names/descriptions
                 # return [
@@ -529,12 +599,7 @@ class EntityEliminator:
         # Convert descriptions into vectors
         entityid2entityid = {}
         vectors = self.vectorize_entities(all_entities)
-        similarity_matrix = cosine_similarity(vectors)
-        # similarity matrix is an n × n matrix, where n is the number of entities.
-        similarity_matrix = np.nan_to_num(similarity_matrix)  # Replace NaN with 0
-        # Replace 1 with 0.999 to avoid 1.0 similarity
-        similarity_matrix[similarity_matrix >= 1] = 0.999
-        info(f"Computed similarity matrix of shape {similarity_matrix.shape}.")
+        info(f"Computed embeddings of shape {vectors.shape}.")
 
         # Define a similarity threshold
         threshold = self.ENTITY_ELIMINATOR_SIMILARITY_THRESHOLD  # Adjust based on the dataset
@@ -543,7 +608,7 @@ class EntityEliminator:
         # 如果有100个实体，相似度矩阵是100×100 = 10,000个pair。如果直接让LLM处理所有可能的组合，会：
         #    成本太高（太多LLM调用）
         #    效率太低（大部分pair完全不相关）
-        clusters = self.cluster_entities(all_entities, similarity_matrix, threshold)
+        clusters = self.cluster_entities(all_entities, vectors, threshold)
         info(f"Generated {len(clusters)} clusters with different name for resolution.")
         info(f"Maximum cluster size: {max(len(cluster) for cluster in clusters)}")
             
@@ -583,6 +648,16 @@ class EntityEliminator:
         return resolved_entities, entityid2entityid
 
     def run(self, inputs=None):
+        # The chunk pool lives for a single run, so a failed run does not leak
+        # its threads and a second run does not reuse a shut-down pool
+        self.chunk_executor = ThreadPoolExecutor(max_workers=self.NUM_WORKERS, thread_name_prefix="EntityEliminatorChunk")
+        try:
+            return self._run(inputs)
+        finally:
+            self.chunk_executor.shutdown(wait=False, cancel_futures=True)
+            self.chunk_executor = None
+
+    def _run(self, inputs):
         
         info("=" * 100)
         info("Running Entity Eliminator".center(100))
@@ -598,8 +673,7 @@ class EntityEliminator:
 
         # Load the input data if not provided
         if inputs is None:
-            with open(self.ENTITY_ELIMINATOR_INPUT_PATH, "r", encoding="utf-8") as f:
-                inputs = json.load(f)
+            inputs = load_json(self.ENTITY_ELIMINATOR_INPUT_PATH)
             info(f"Loaded {len(inputs)} examples from {os.path.relpath(self.ENTITY_ELIMINATOR_INPUT_PATH, PROJECT_ROOT)}.")
 
         # Extract all entities from the input data
@@ -618,14 +692,10 @@ class EntityEliminator:
 
         # Save cache only if not in direct mode
         if not direct_mode:
-            if not os.path.exists("cache"):
-                os.makedirs("cache")
             base_name = os.path.basename(self.ENTITY_ELIMINATOR_INPUT_PATH)
-            with open(f"cache/resolved_entities_same_name_{base_name}.json", "w", encoding="utf-8") as f:
-                json.dump(resolved_entities, f, indent=2, ensure_ascii=False)
+            save_json(resolved_entities, f"cache/resolved_entities_same_name_{base_name}.json")
             info(f"Resolved entities with same name saved to cache/resolved_entities_same_name_{base_name}.json.")
-            with open(f"cache/entityid2entityid_1_{base_name}.json", "w", encoding="utf-8") as f:
-                json.dump(entityid2entityid_1, f, indent=2, ensure_ascii=False)
+            save_json(entityid2entityid_1, f"cache/entityid2entityid_1_{base_name}.json")
 
         # Resolve conflicts with different names
         resolved_entities, entityid2entityid_2 = self.resolve_conflicts_with_different_name(resolved_entities)
@@ -633,11 +703,9 @@ class EntityEliminator:
         # Save cache only if not in direct mode
         if not direct_mode:
             base_name = os.path.basename(self.ENTITY_ELIMINATOR_INPUT_PATH)
-            with open(f"cache/resolved_entities_different_name_{base_name}.json", "w", encoding="utf-8") as f:
-                json.dump(resolved_entities, f, indent=2, ensure_ascii=False)
+            save_json(resolved_entities, f"cache/resolved_entities_different_name_{base_name}.json")
             info(f"Resolved entities with different name saved to cache/resolved_entities_different_name_{base_name}.json.")
-            with open(f"cache/entityid2entityid_2_{base_name}.json", "w", encoding="utf-8") as f:
-                json.dump(entityid2entityid_2, f, indent=2, ensure_ascii=False)
+            save_json(entityid2entityid_2, f"cache/entityid2entityid_2_{base_name}.json")
 
         # Combine the two mappings
         entityid2entityid = {
@@ -712,11 +780,9 @@ class EntityEliminator:
                     
         # Save the results only if not in direct mode
         if not direct_mode:
-            with open(self.ENTITY_ELIMINATOR_OUTPUT_PATH, "w", encoding="utf-8") as f:
-                json.dump(inputs, f, indent=2, ensure_ascii=False)
+            save_json(inputs, self.ENTITY_ELIMINATOR_OUTPUT_PATH)
             info(f"Entity mapping saved to {os.path.relpath(self.ENTITY_ELIMINATOR_OUTPUT_MAP_PATH, PROJECT_ROOT)}, {original_entity_count - unique_entity_count} entities merged.")
-            with open(self.ENTITY_ELIMINATOR_OUTPUT_MAP_PATH, "w", encoding="utf-8") as f:
-                json.dump(entityid2entityid, f, indent=2, ensure_ascii=False)
+            save_json(entityid2entityid, self.ENTITY_ELIMINATOR_OUTPUT_MAP_PATH)
         else:
             info(f"{original_entity_count - unique_entity_count} entities merged (direct mode - not saved to file)")
 
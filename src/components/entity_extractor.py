@@ -1,7 +1,7 @@
 import os
 import re
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 import threading
 
 from tqdm import tqdm
@@ -12,7 +12,7 @@ from src.utils.logger import info, error
 from src import PROJECT_ROOT
 
 class EntityExtractor:
-    def __init__(self):
+    def __init__(self, config=None, progress=None, cancel_event=None):
 
         self.ENTITY_EXTRACTOR_PROMPT_PATH = None
         self.ENTITY_EXTRACTOR_INPUT_PATH = None
@@ -29,9 +29,17 @@ class EntityExtractor:
             raise EnvironmentError("Environment variables are not defined correctly")
 
         # optional parameter with default values
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", "0.6"))
-        self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", "4"))
-        self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", "10"))
+        if config is not None:
+            self.TEMPERATURE = config.TEMPERATURE
+            self.NUM_WORKERS = config.NUM_WORKERS
+            self.SAVE_INTERVAL = config.SAVE_INTERVAL
+        else:
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", "0.6"))
+            self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", "4"))
+            self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", "10"))
+
+        self.progress = progress
+        self.cancel_event = cancel_event
 
         # Thread-safe counters
         self.total_prompt_tokens = 0
@@ -94,13 +102,19 @@ class EntityExtractor:
             error(f"Error processing input {cur_input.get('id', 'unknown id')}: {e}")
             return None, None
 
-    def run(self, inputs=None):
+    def run(self, inputs=None, on_result=None):
         
         info("=" * 100)
         info("Running Entity Extractor".center(100))
         info("=" * 100)
 
-        """Main entity extraction pipeline"""
+        """
+        Main entity extraction pipeline
+
+        on_result, if given, is called as on_result(i) from the calling thread
+        once inputs[i] is final (extracted, or left as-is because it failed),
+        so a caller can start on finished inputs while the rest are in flight.
+        """
         # Determine if we're in direct mode (inputs provided)
         direct_mode = inputs is not None
 
@@ -122,17 +136,25 @@ class EntityExtractor:
         all_num, success_num = 0, 0
 
         with ThreadPoolExecutor(max_workers=self.NUM_WORKERS) as executor:
-            futures = []
+            futures = {}
             for i, cur_input in enumerate(inputs):
                 if "entity" not in cur_input:
-                    futures.append(executor.submit(self.process_input, cur_input, entity_extractor_prompt, i))
+                    futures[executor.submit(self.process_input, cur_input, entity_extractor_prompt, i)] = i
 
             all_num = len(futures)
 
             iterator = tqdm(as_completed(futures), total=len(futures), dynamic_ncols=True, desc="Extracting entities")
 
+            if self.progress is not None:
+                self.progress.set_total(len(futures))
             for future in iterator:
-                result, i = future.result(timeout=10*60)
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise CancelledError()
+                if self.progress is not None:
+                    self.progress.increment()
+                result, _ = future.result(timeout=10*60)
+                i = futures[future]
                 if result != None:
                     inputs[i] = result
                     success_num += 1
@@ -142,6 +164,9 @@ class EntityExtractor:
                         save_json(inputs, self.ENTITY_EXTRACTOR_OUTPUT_PATH)
                         info(f"Saved checkpoint: {success_num}/{all_num} processed")
 
+                if on_result is not None:
+                    on_result(i)
+
         # Only save if not in direct mode
         if not direct_mode:
             if success_num or not os.path.exists(self.ENTITY_EXTRACTOR_OUTPUT_PATH):
@@ -1,7 +1,7 @@
 import re
 import os
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 import threading
 from src import PROJECT_ROOT
 from src.utils.api_utils import call_api_qwen
@@ -9,7 +9,7 @@ from src.utils.file_utils import load_json,save_json,read_text_file
 from src.utils.logger import info, error
 
 class FactExtractor:
-    def __init__(self):
+    def __init__(self, config=None, progress=None, cancel_event=None):
         self.FACT_EXTRACTOR_INPUT_PATH = None
         self.FACT_EXTRACTOR_PROMPT_PATH = None
         self.FACT_EXTRACTOR_OUTPUT_PATH = None
@@ -24,9 +24,17 @@ class FactExtractor:
         else:
             raise EnvironmentError("Environment variables are not configured properly.")
         
-        self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
-        self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
+        if config is not None:
+            self.NUM_WORKERS = config.NUM_WORKERS
+            self.TEMPERATURE = config.TEMPERATURE
+            self.SAVE_INTERVAL = config.SAVE_INTERVAL
+        else:
+            self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+            self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
+
+        self.progress = progress
+        self.cancel_event = cancel_event
 
         # Thread-safe token counters
         self.total_prompt_tokens = 0
@@ -90,7 +98,14 @@ class FactExtractor:
                     futures.append(executor.submit(self.process_input, cur_input, fact_extractor_prompt, i))
 
             all_num = len(futures)
+            if self.progress is not None:
+                self.progress.set_total(len(futures))
             for future in tqdm(as_completed(futures), total=len(futures), desc='Extracting Facts...', dynamic_ncols=True):
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise CancelledError()
+                if self.progress is not None:
+                    self.progress.increment()
                 result, i = future.result(timeout=10*60)
                 if result != None:
                     inputs[i] = result
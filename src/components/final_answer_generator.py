@@ -4,7 +4,7 @@ import json
 import signal
 from typing import List, Dict
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 import threading
 
 from src import PROJECT_ROOT
@@ -20,7 +20,7 @@ from src.utils.rag_utils import (
     list_to_docided_string)
 
 class FinalAnswerGenerator:
-    def __init__(self):
+    def __init__(self, config=None, progress=None, cancel_event=None):
 
         info("=" * 100)
         info("Running Final Answer Generator".center(100))
@@ -44,10 +44,19 @@ class FinalAnswerGenerator:
             raise EnvironmentError("Environment variables is not defined properly.")
 
         # Optional parameters
-        self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
-        self.FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES = int(os.getenv("FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES", 300))
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
-        self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
+        if config is not None:
+            self.NUM_WORKERS = config.NUM_WORKERS
+            self.FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES = config.FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES
+            self.TEMPERATURE = config.TEMPERATURE
+            self.SAVE_INTERVAL = config.SAVE_INTERVAL
+        else:
+            self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
+            self.FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES = int(os.getenv("FINAL_ANSWER_GENERATOR_MAX_GEN_TIMES", 300))
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+            self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
+
+        self.progress = progress
+        self.cancel_event = cancel_event
 
         # Token usage tracker
         self.total_prompt_tokens = 0
@@ -200,7 +209,14 @@ class FinalAnswerGenerator:
                 raise ValueError(f"Unknown data file: {self.FINAL_ANSWER_GENERATOR_GENERATED_TYPE}")
 
             all_num = len(futures_to_data)
+            if self.progress is not None:
+                self.progress.set_total(all_num)
             for future in tqdm(as_completed(futures_to_data), total=all_num, desc="Evaluating Test-Cases", dynamic_ncols=True):
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise CancelledError()
+                if self.progress is not None:
+                    self.progress.increment()
                 # rephrased_questions, rephrased_questions_part, rephrased_questions_hybrid = futures_to_data[future]
                 _ = futures_to_data[future]
                 try:
@@ -1,15 +1,22 @@
 import re
 import os
+import shutil
 from dotenv import load_dotenv
 import re
 
-from src.utils.api_utils import call_api_qwen
+from src.utils.api_utils import call_api_qwen, DEFAULT_QWEN_MODEL
 from src.utils.file_utils import save_json, read_text_file, extract_text_from_pdf
+from src.utils.hashing import canonical_json, content_hash
 from src.utils.logger import info, error
 from src import PROJECT_ROOT
 
+# Chunk files of earlier runs, kept next to the LLM response cache
+PREPROCESSOR_CACHE_DIR = os.path.join(PROJECT_ROOT, os.getenv("PREPROCESSOR_CACHE_DIR", "cache/preprocessor"))
+# Most recently used chunk files kept; older ones are deleted
+PREPROCESSOR_CACHE_MAX_FILES = int(os.getenv("PREPROCESSOR_CACHE_MAX_FILES", "16"))
+
 class Preprocessor:
-    def __init__(self):
+    def __init__(self, config=None):
         self.PREPROCESSOR_PDF_PATH = None
         self.PREPROCESSOR_PROMPT_PATH = None
         self.PREPROCESSOR_CLEANED_OUTPUT_PATH = None
@@ -25,7 +32,39 @@ class Preprocessor:
         else:
             raise EnvironmentError("Environment variables are not defined correctly")
 
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+        if config is not None:
+            self.TEMPERATURE = config.TEMPERATURE
+        else:
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+
+        # Chunk file written (or reused) by the last file-mode run
+        self.last_output_path = self.PREPROCESSOR_CHUNKED_OUTPUT_PATH
+        # Chunks produced by the last file-mode run, so callers need not re-read last_output_path
+        self.last_chunk_contents = None
+
+    def cached_output_path(self, pdf_path):
+        """
+        Path of the cached chunk file for this exact PDF, cleaning prompt and model settings.
+
+        The name carries a hash of all of them, so a changed PDF, prompt, model
+        or temperature never picks up a stale file.
+        """
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        prompt_bytes = read_text_file(self.PREPROCESSOR_PROMPT_PATH).encode('utf-8')
+        settings = canonical_json([DEFAULT_QWEN_MODEL, float(self.TEMPERATURE)])
+        digest = content_hash(settings + b'\0' + prompt_bytes + b'\0' + pdf_bytes)[:16]
+        root, ext = os.path.splitext(os.path.basename(self.PREPROCESSOR_CHUNKED_OUTPUT_PATH))
+        return os.path.join(PREPROCESSOR_CACHE_DIR, f"{root}.{digest}{ext}")
+
+    def evict_cached_outputs(self):
+        """Delete all but the PREPROCESSOR_CACHE_MAX_FILES most recently used cached chunk files"""
+        try:
+            entries = sorted(os.scandir(PREPROCESSOR_CACHE_DIR), key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in entries[PREPROCESSOR_CACHE_MAX_FILES:]:
+                os.remove(entry.path)
+        except OSError as e:
+            error(f"Could not prune the chunk cache: {e}")
     
     def process_chunk_text(self, chunk, counter):
         """
@@ -109,6 +148,22 @@ class Preprocessor:
         success_num = 0
         all_num = 3
 
+        # Reuse the chunks of an earlier run on the same PDF and prompt
+        cached_path = None
+        self.last_output_path = self.PREPROCESSOR_CHUNKED_OUTPUT_PATH
+        self.last_chunk_contents = None
+        if not direct_mode:
+            try:
+                cached_path = self.cached_output_path(self.PREPROCESSOR_PDF_PATH)
+            except OSError as e:
+                error(f"Could not hash PDF for the chunk cache: {e}")
+            if cached_path and os.path.exists(cached_path):
+                os.utime(cached_path)  # Mark as recently used for eviction
+                shutil.copyfile(cached_path, self.PREPROCESSOR_CHUNKED_OUTPUT_PATH)
+                self.last_output_path = cached_path
+                info(f"PDF unchanged, reusing chunks from {os.path.relpath(cached_path, PROJECT_ROOT)}")
+                return total_prompt_tokens, total_completion_tokens, all_num, all_num
+
         try:
             # Use provided pdf or default path from env
             if pdf is None:
@@ -153,6 +208,12 @@ class Preprocessor:
 
             if not direct_mode:
                 save_json(chunk_contents, self.PREPROCESSOR_CHUNKED_OUTPUT_PATH)
+                self.last_chunk_contents = chunk_contents
+                if cached_path:
+                    os.makedirs(PREPROCESSOR_CACHE_DIR, exist_ok=True)
+                    shutil.copyfile(self.PREPROCESSOR_CHUNKED_OUTPUT_PATH, cached_path)
+                    self.last_output_path = cached_path
+                    self.evict_cached_outputs()
 
             success_num += 1
             info(f"Questions chunked successfully. Created {len(chunk_contents)} chunks")
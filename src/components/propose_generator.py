@@ -5,14 +5,14 @@ from tqdm import tqdm
 import threading
 from src import PROJECT_ROOT
 from src.components.entity_graph_constructor import EntityRelationshipGraph
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 from src.utils.api_utils import call_api_qwen
 from src.utils.rag_utils import reformat_objective_facts, convert_set_to_list
 from src.utils.file_utils import read_text_file, save_json, load_json
 from src.utils.logger import info, error
 
 class ProposeGenerator:
-    def __init__(self):
+    def __init__(self, config=None, progress=None, cancel_event=None):
         self.PROPOSE_GENERATOR_PROMPT_PATH = None
         self.PROPOSE_GENERATOR_GENERATED_TYPE = None
         self.PROPOSE_GENERATOR_INPUT_PATH = None
@@ -39,11 +39,21 @@ class ProposeGenerator:
             raise EnvironmentError("Environment variables not configured properly for Propose Generator.")
 
         # Optional Parameters
-        self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
-        self.PROPOSE_GENERATOR_MAX_GEN_TIMES = int(os.getenv("MAX_QUESTION_GENERATED", 300))
-        self.MAX_QUESTION = int(os.getenv("MAX_QUESTION_PER_CHUNK", 3))
-        self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
-        self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+        if config is not None:
+            self.NUM_WORKERS = config.NUM_WORKERS
+            self.PROPOSE_GENERATOR_MAX_GEN_TIMES = config.MAX_QUESTION_GENERATED
+            self.MAX_QUESTION = config.MAX_QUESTION_PER_CHUNK
+            self.SAVE_INTERVAL = config.SAVE_INTERVAL
+            self.TEMPERATURE = config.TEMPERATURE
+        else:
+            self.NUM_WORKERS = int(os.getenv("NUM_WORKERS", 4))
+            self.PROPOSE_GENERATOR_MAX_GEN_TIMES = int(os.getenv("MAX_QUESTION_GENERATED", 300))
+            self.MAX_QUESTION = int(os.getenv("MAX_QUESTION_PER_CHUNK", 3))
+            self.SAVE_INTERVAL = int(os.getenv("SAVE_INTERVAL", 10))
+            self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.6))
+
+        self.progress = progress
+        self.cancel_event = cancel_event
 
         # token usage tracker
         self.total_prompt_tokens = 0
@@ -85,7 +95,7 @@ class ProposeGenerator:
 
     def process_input_content(self, cur_input, cur_propose_generator_prompt, i):
         try:
-            propose_generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_propose_generator_prompt, temperature=self.TEMPERATURE, system_prompt=self.PROPOSE_GENERATOR_SYSTEM_PROMPT)
+            propose_generator_response, prompt_tokens, completion_tokens = call_api_qwen(cur_propose_generator_prompt, temperature=self.TEMPERATURE, system_prompt=self.PROPOSE_GENERATOR_SYSTEM_PROMPT, use_cache=False)
 
             # Thread-safe token accumulation
             with self.token_lock:
@@ -153,7 +163,13 @@ class ProposeGenerator:
                     tasks.append(future)
 
                 all_num = len(tasks)
+                if self.progress is not None:
+                    self.progress.set_total(len(tasks))
                 for future in tqdm(as_completed(tasks), total=len(tasks), desc="Generating Questions...", dynamic_ncols=True):
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        raise CancelledError()
+                    if self.progress is not None:
+                        self.progress.increment()
                     try:
                         result, i, questions_count = future.result(timeout=10*60)
 
@@ -222,7 +238,7 @@ class ProposeGenerator:
             already_done_entity_ids = set([int(entity_id) for entity_id in already_done_entity_ids])
 
             all_num, success_num = 0, 0
-            tasks = []
+            future_to_entity = {}
 
             self.executor = ThreadPoolExecutor(max_workers=self.NUM_WORKERS)
             try:
@@ -242,15 +258,18 @@ class ProposeGenerator:
 
                     cur_propose_generator_prompt = purpose_generator_prompt.replace('[[ENTITY_NAME]]', public_entity_name)
                     cur_propose_generator_prompt = cur_propose_generator_prompt.replace('[[CONTEXT]]', entity_relationship_prompt)
-                    future = self.executor.submit(call_api_qwen, cur_propose_generator_prompt, temperature=self.TEMPERATURE, system_prompt=self.PROPOSE_GENERATOR_SYSTEM_PROMPT)
-                    tasks.append((future, cur_entity_id, subgraph_depth_1, cur_objective_relationships, cur_objective_relationship_prompts))
-
-                all_num = len(tasks)
-                for future in tqdm(as_completed([t[0] for t in tasks]), total=len(tasks), desc="Generating Questions...", dynamic_ncols=True):
-                    idx = [t[0] for t in tasks].index(future)
-                    if idx == -1:
-                        raise ValueError("Invalid index.")
-                    cur_entity_id, subgraph_depth_1, cur_objective_relationships, cur_objective_relationship_prompts = tasks[idx][1], tasks[idx][2], tasks[idx][3], tasks[idx][4]
+                    future = self.executor.submit(call_api_qwen, cur_propose_generator_prompt, temperature=self.TEMPERATURE, system_prompt=self.PROPOSE_GENERATOR_SYSTEM_PROMPT, use_cache=False)
+                    future_to_entity[future] = (cur_entity_id, subgraph_depth_1, cur_objective_relationships, cur_objective_relationship_prompts)
+
+                all_num = len(future_to_entity)
+                if self.progress is not None:
+                    self.progress.set_total(all_num)
+                for future in tqdm(as_completed(future_to_entity), total=all_num, desc="Generating Questions...", dynamic_ncols=True):
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        raise CancelledError()
+                    if self.progress is not None:
+                        self.progress.increment()
+                    cur_entity_id, subgraph_depth_1, cur_objective_relationships, cur_objective_relationship_prompts = future_to_entity[future]
 
                     try:
                         propose_generator_response, prompt_tokens, completion_tokens = future.result(timeout=10*60)
@@ -1,15 +1,49 @@
 from dotenv import load_dotenv
 from openai import OpenAI
 import os
+import threading
 import numpy as np
 
+from src.utils import llm_cache
+
 load_dotenv()
 
-def call_api_qwen(query, model="qwen-plus", temperature=0, system_prompt=None):
-    client = OpenAI(
-        api_key=os.getenv("QWEN_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-    )
+_QWEN_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+# Chat model used when callers do not name one
+DEFAULT_QWEN_MODEL = "qwen-plus"
+
+# One client shared by every call and thread, so its connection pool keeps
+# connections alive instead of paying a new TLS handshake per request
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_qwen_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=os.getenv("QWEN_API_KEY"),
+                    base_url=_QWEN_BASE_URL
+                )
+    return _client
+
+
+def call_api_qwen(query, model=DEFAULT_QWEN_MODEL, temperature=0, system_prompt=None, use_cache=True, validate=None):
+    # Low-temperature calls are served from the response cache when possible;
+    # a cache hit uses no tokens, so it reports zero usage. `validate` is the
+    # caller's parse check: only responses passing it are stored, and a cached
+    # response failing it is treated as a miss, so retrying after a bad answer
+    # reaches the model again instead of replaying the same answer.
+    cache_key = None
+    if use_cache and llm_cache.is_cacheable(temperature):
+        cache_key = llm_cache.make_key(query, model, temperature, system_prompt)
+        cached = llm_cache.get(cache_key)
+        if cached is not None and (validate is None or validate(cached)):
+            return cached, 0, 0
+
+    client = get_qwen_client()
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -23,6 +57,8 @@ def call_api_qwen(query, model="qwen-plus", temperature=0, system_prompt=None):
     prompt_tokens = completion.usage.prompt_tokens
     completion_tokens = completion.usage.completion_tokens
     content = completion.choices[0].message.content
+    if cache_key is not None and content is not None and (validate is None or validate(content)):
+        llm_cache.put(cache_key, content)
     return content,prompt_tokens,completion_tokens
 
 
@@ -30,27 +66,22 @@ def get_qwen_embeddings(texts, dim=1024):
     # Refference for embeddings model:
     # https://www.alibabacloud.com/help/en/model-studio/embedding?spm=a2c63.l28256.help-menu-2400256.d_0_8_0.95cf4f2cBwSJ26
     # dim options = 2,048, 1,536, 1,024 (default), 768, 512, 256, 128, 64
-    client = OpenAI(
-        api_key=os.getenv("QWEN_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-    )
+    client = get_qwen_client()
     response = client.embeddings.create(
         model="text-embedding-v4",
         input=texts,
         dimensions = dim,
     )
 
-    embeddings = [np.array(data.embedding) for data in response.data]
+    # float32 is what the similarity step uses; skip the float64 intermediate
+    embeddings = [np.array(data.embedding, dtype=np.float32) for data in response.data]
     total_tokens = response.usage.total_tokens
 
     return embeddings, total_tokens
 
 
 def get_qwen_logprobs(prompt, top_logprobs=5, model='qwen-plus'):
-    client = OpenAI(
-        api_key=os.getenv("QWEN_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-    )
+    client = get_qwen_client()
 
     response = client.chat.completions.create(
         model=model,
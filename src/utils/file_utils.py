@@ -1,6 +1,6 @@
 from pathlib import Path
-import json
 import os
+import orjson
 import PyPDF2
 from pathlib import Path
 
@@ -8,20 +8,59 @@ def read_text_file(path):
     with open(path, 'r', encoding='utf-8') as f:
         return f.read()
 
+# orjson writes UTF-8 bytes directly (same output as ensure_ascii=False);
+# OPT_NON_STR_KEYS keeps int-keyed dicts (e.g. entity ids) serializable like json.dump
+_ORJSON_SAVE_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
 def save_json(data, path, verbose=False):
     """Save data to JSON file."""
     dir_path = os.path.dirname(path)
     if dir_path:  # Only create directory if path includes one
         os.makedirs(dir_path, exist_ok=True)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data, option=_ORJSON_SAVE_OPTIONS))
     if verbose:
         print(f"Saved {len(data)} items to {path}")
 
+def stream_save_json_array(items, path, verbose=False):
+    """Save a list to a JSON array file, encoding one item at a time to bound peak memory."""
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b'[')
+        for item in items:
+            f.write(b',\n' if count else b'\n')
+            f.write(orjson.dumps(item, option=_ORJSON_SAVE_OPTIONS))
+            count += 1
+        f.write(b'\n]' if count else b']')
+    if verbose:
+        print(f"Saved {count} items to {path}")
+
+def stream_save_json_object(mapping, path, verbose=False):
+    """Save a dict to a JSON object file, encoding one value at a time to bound peak memory."""
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b'{')
+        for key, value in mapping.items():
+            f.write(b',\n' if count else b'\n')
+            # Non-str keys (e.g. int entity ids) are stringified, as json.dump would
+            f.write(orjson.dumps(key if isinstance(key, str) else str(key)))
+            f.write(b': ')
+            f.write(orjson.dumps(value, option=_ORJSON_SAVE_OPTIONS))
+            count += 1
+        f.write(b'\n}' if count else b'}')
+    if verbose:
+        print(f"Saved {count} items to {path}")
+
 def load_json(path,verbose=False):
     """Load data from JSON file."""
-    with open(path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
     if verbose:
         print(f"Loaded {len(data)} items from {path}")
     return data
@@ -0,0 +1,22 @@
+"""
+Content hashing for cache keys.
+"""
+import hashlib
+
+import orjson
+
+
+def canonical_json(obj) -> bytes:
+    """Serialize obj to JSON bytes with sorted keys, so equal objects hash equally"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Hex digest identifying a piece of content.
+
+    SHA-256 via hashlib uses OpenSSL, which picks the SHA-NI instructions when
+    the CPU has them; on such machines it is about twice as fast as blake2b
+    on multi-MB inputs, and needs no extra dependency.
+    """
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,98 @@
+"""
+Persistent cache of LLM responses, keyed on the exact request.
+
+Re-running the pipeline on an unchanged document sends the same prompts
+again; with a low temperature the answers are effectively fixed, so they
+are served from a local SQLite file instead of the API. Calls above
+LLM_CACHE_MAX_TEMPERATURE are never cached, since a different answer on
+each run is the point of sampling at that temperature. At most
+LLM_CACHE_MAX_ENTRIES responses are kept; the least recently used are
+deleted first.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from src import PROJECT_ROOT
+from src.utils.hashing import canonical_json, content_hash
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.path.join(PROJECT_ROOT, os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite3"))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+
+# A single connection shared by all worker threads; the lock serializes access.
+# Lookups are tiny next to the LLM calls they replace.
+_conn = None
+_conn_lock = threading.Lock()
+# Rows in the cache table, kept in memory so a put need not COUNT(*) the table
+_entry_count = 0
+
+
+def _get_conn():
+    """Open the cache database on first use (caller must hold _conn_lock)"""
+    global _conn, _entry_count
+    if _conn is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                     "(key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL DEFAULT 0)")
+        # Caches written before entries were bounded lack the column
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "last_used" not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        conn.commit()
+        _entry_count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        _conn = conn
+        _evict_oldest(conn)
+    return _conn
+
+
+def _evict_oldest(conn):
+    """Delete the least recently used rows past LLM_CACHE_MAX_ENTRIES (caller must hold _conn_lock)"""
+    global _entry_count
+    excess = _entry_count - LLM_CACHE_MAX_ENTRIES
+    if excess > 0:
+        conn.execute("DELETE FROM cache WHERE key IN "
+                     "(SELECT key FROM cache ORDER BY last_used LIMIT ?)", (excess,))
+        conn.commit()
+        _entry_count = LLM_CACHE_MAX_ENTRIES
+
+
+def is_cacheable(temperature: float) -> bool:
+    """Whether a call at this temperature may be served from or stored in the cache"""
+    return LLM_CACHE_ENABLED and temperature <= LLM_CACHE_MAX_TEMPERATURE
+
+
+def make_key(prompt: str, model: str, temperature: float, system_prompt: Optional[str] = None) -> str:
+    """Hash everything that determines the response into a cache key"""
+    return content_hash(canonical_json([model, float(temperature), system_prompt, prompt]))
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None on a miss"""
+    with _conn_lock:
+        conn = _get_conn()
+        row = conn.execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+    return row[0] if row else None
+
+
+def put(key: str, response: str):
+    """Store a response under key, evicting the least recently used entries past the cap"""
+    global _entry_count
+    with _conn_lock:
+        conn = _get_conn()
+        is_new = conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is None
+        conn.execute("INSERT OR REPLACE INTO cache (key, response, last_used) VALUES (?, ?, ?)",
+                     (key, response, time.time()))
+        conn.commit()
+        if is_new:
+            _entry_count += 1
+            _evict_oldest(conn)
@@ -12,7 +12,9 @@ import sys
 import os
 import datetime
 
-__all__ = ['set_file_handler']  # the actual worker is the '_logger'
+import orjson
+
+__all__ = ['set_file_handler', 'info_event']  # the actual worker is the '_logger'
 
 color2id = {"grey": 30, "red": 31, "green": 32, "yellow": 33, "blue": 34, "magenta": 35, "cyan": 36, "white": 37}
 
@@ -124,3 +126,14 @@ for func in _LOGGING_METHOD:
     original_func = getattr(_logger, func)
     locals()[func] = _make_flush_wrapper(original_func)
     __all__.append(func)
+
+
+def info_event(event, **fields):
+    '''
+        @brief:
+            log one structured INFO record as a single JSON line. The fields are
+            also attached to the record (extra=) for handlers that emit JSON
+    '''
+    payload = {"event": event, **fields}
+    _logger.info(orjson.dumps(payload).decode(), extra={"event": event, "event_fields": fields}, stacklevel=2)
+    sys.stdout.flush()
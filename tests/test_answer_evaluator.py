@@ -0,0 +1,65 @@
+"""
+Tests for AnswerEvaluator's coalescing of duplicate scoring calls (no LLM calls).
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.components.answer_evaluator import AnswerEvaluator
+
+
+@pytest.fixture
+def evaluator(monkeypatch, tmp_path):
+    monkeypatch.delenv("ANSWER_EVALUATOR_CONTENT_INPUT_PATH", raising=False)
+    monkeypatch.setenv("ANSWER_EVALUATOR_ENTITYGRAPH_INPUT_PATH", str(tmp_path / "input.json"))
+    monkeypatch.setenv("ANSWER_EVALUATOR_ENTITYGRAPH_OUTPUT_PATH", str(tmp_path / "output.json"))
+    for name in ("relevance", "semantic_similarity", "inferability", "practicality"):
+        monkeypatch.setenv(f"ANSWER_EVALUATOR_{name.upper()}_PROMPT_PATH", f"src/prompts/answer_evaluator/{name}.txt")
+    return AnswerEvaluator()
+
+
+def test_submit_score_coalesces_identical_calls(evaluator):
+    calls = []
+    lock = threading.Lock()
+
+    def score_relevance(answer, question):
+        with lock:
+            calls.append((answer, question))
+        return "Score: 5", 1, 1
+
+    pending_scores = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = evaluator.submit_score(executor, pending_scores, score_relevance, "A", "Q?")
+        duplicate = evaluator.submit_score(executor, pending_scores, score_relevance, "A", "Q?")
+        other = evaluator.submit_score(executor, pending_scores, score_relevance, "B", "Q?")
+        assert duplicate is first
+        assert other is not first
+        assert first.result() == other.result() == ("Score: 5", 1, 1)
+
+    assert sorted(calls) == [("A", "Q?"), ("B", "Q?")]
+
+
+def test_submit_score_keys_on_the_scorer(evaluator):
+    def score_relevance(answer, question):
+        return "relevance"
+
+    def score_practicality(answer, question):
+        return "practicality"
+
+    pending_scores = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        relevance = evaluator.submit_score(executor, pending_scores, score_relevance, "A", "Q?")
+        practicality = evaluator.submit_score(executor, pending_scores, score_practicality, "A", "Q?")
+        assert (relevance.result(), practicality.result()) == ("relevance", "practicality")
+
+
+def test_has_score(evaluator):
+    assert evaluator.has_score("Reasoning: fine.\nScore: 4")
+    assert not evaluator.has_score("I cannot rate this.")
@@ -0,0 +1,97 @@
+"""
+Tests for EntityEliminator's similarity clustering and conflict resolution (the LLM is faked).
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from src.components import entity_eliminator as entity_eliminator_module
+from src.components.entity_eliminator import EntityEliminator
+
+
+@pytest.fixture
+def eliminator(monkeypatch, tmp_path):
+    monkeypatch.setenv("ENTITY_ELIMINATOR_INPUT_PATH", str(tmp_path / "input.json"))
+    monkeypatch.setenv("ENTITY_ELIMINATOR_OUTPUT_PATH", str(tmp_path / "output.json"))
+    monkeypatch.setenv("ENTITY_ELIMINATOR_OUTPUT_MAP_PATH", str(tmp_path / "map.json"))
+    return EntityEliminator()
+
+
+def _dbscan_clusters(vectors, threshold):
+    """Clusters as the previous implementation computed them"""
+    distance_matrix = np.clip(1 - vectors @ vectors.T, 0, None)
+    labels = DBSCAN(eps=1 - threshold, min_samples=1, metric="precomputed").fit_predict(distance_matrix)
+    clusters = [[] for _ in range(max(labels) + 1)]
+    for idx, label in enumerate(labels):
+        clusters[label].append(idx)
+    return clusters
+
+
+def _normalized_fixture(seed=0, n_centers=6, per_center=8, dim=16, noise=0.35):
+    """Noisy points around a few random directions, L2-normalized"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_centers, dim))
+    vectors = np.repeat(centers, per_center, axis=0) + noise * rng.normal(size=(n_centers * per_center, dim))
+    vectors = vectors[rng.permutation(len(vectors))].astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.65, 0.8])
+@pytest.mark.parametrize("block_size", [5, 1024])
+def test_cluster_entities_matches_dbscan(eliminator, threshold, block_size):
+    vectors = _normalized_fixture()
+    entities = [{"entity_id": i} for i in range(len(vectors))]
+
+    clusters = eliminator.cluster_entities(entities, vectors, threshold, block_size=block_size)
+
+    expected = _dbscan_clusters(vectors, threshold)
+    assert sorted(map(sorted, clusters)) == sorted(map(sorted, expected))
+    # Every entity lands in exactly one cluster
+    assert sorted(idx for cluster in clusters for idx in cluster) == list(range(len(vectors)))
+
+
+def test_cluster_entities_chains_transitively(eliminator):
+    # a~b and b~c are above the threshold, a~c is not: all three still form one cluster
+    angles = np.radians([0, 40, 80, 180])
+    vectors = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+
+    clusters = eliminator.cluster_entities([{}] * 4, vectors, threshold=0.7, block_size=1)
+
+    assert sorted(map(sorted, clusters)) == [[0, 1, 2], [3]]
+
+
+def test_resolves_all_ids(eliminator):
+    response = 'Result:\n```json\n[{"entity_ids": [1, 2]}, {"entity_ids": [2, 3]}]\n```'
+
+    assert eliminator.resolves_all_ids(response, [1, 2, 3], dedupe=True)
+    assert not eliminator.resolves_all_ids(response, [1, 2, 3])
+    assert not eliminator.resolves_all_ids(response, [1, 2], dedupe=True)
+    assert not eliminator.resolves_all_ids("no json here", [1])
+
+
+def test_resolve_conflicts_with_same_name_outside_run(eliminator, monkeypatch):
+    def merge_all(prompt, **kwargs):
+        # Merge every entity in the prompt into one
+        entity_ids = [int(entity_id) for entity_id in re.findall(r'"entity_id": (\d+)', prompt)]
+        response = [{"entity_ids": entity_ids, "new_entity_name": "Worker", "new_entity_description": "merged"}]
+        return json.dumps(response), 1, 1
+
+    monkeypatch.setattr(entity_eliminator_module, "call_api_qwen", merge_all)
+    entities = [{"entity_id": i, "entity_name": "Worker", "entity_description": f"d{i}"} for i in range(3)]
+    entities.append({"entity_id": 3, "entity_name": "Manager", "entity_description": "d3"})
+
+    # No chunk pool exists outside run(), so the chunks are resolved inline
+    assert eliminator.chunk_executor is None
+    resolved_entities, entityid2entityid = eliminator.resolve_conflicts_with_same_name(entities)
+
+    assert sorted(entity["entity_id"] for entity in resolved_entities) == [0, 3]
+    assert entityid2entityid == {0: 0, 1: 0, 2: 0, 3: 3}
@@ -0,0 +1,137 @@
+"""
+Tests for the LLM response cache as used by call_api_qwen (the API client is faked).
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import itertools
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import api_utils, llm_cache
+
+
+class FakeQwenClient:
+    """Stands in for the OpenAI client; answers with the queued responses in order"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature):
+        self.calls += 1
+        content = self.responses.pop(0)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        )
+
+
+@pytest.fixture
+def fake_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_TEMPERATURE", 0.3)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+    # A strictly increasing clock, so least-recently-used order is unambiguous
+    clock = itertools.count(1)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    client = FakeQwenClient(["first", "second", "third"])
+    monkeypatch.setattr(api_utils, "get_qwen_client", lambda: client)
+    yield client
+    if llm_cache._conn is not None:
+        llm_cache._conn.close()
+
+
+def test_is_cacheable_respects_temperature_gate(monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_TEMPERATURE", 0.3)
+    assert llm_cache.is_cacheable(0)
+    assert llm_cache.is_cacheable(0.3)
+    assert not llm_cache.is_cacheable(0.6)
+
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", False)
+    assert not llm_cache.is_cacheable(0)
+
+
+def test_low_temperature_call_is_served_from_cache(fake_client):
+    assert api_utils.call_api_qwen("prompt", temperature=0) == ("first", 12, 3)
+    # A cache hit costs no tokens
+    assert api_utils.call_api_qwen("prompt", temperature=0) == ("first", 0, 0)
+    assert fake_client.calls == 1
+
+    # Anything that changes the request is a different key
+    assert api_utils.call_api_qwen("prompt", temperature=0.1)[0] == "second"
+    assert api_utils.call_api_qwen("prompt", temperature=0, system_prompt="be brief")[0] == "third"
+    assert fake_client.calls == 3
+
+
+def test_high_temperature_call_always_reaches_the_api(fake_client):
+    assert api_utils.call_api_qwen("prompt", temperature=0.6)[0] == "first"
+    assert api_utils.call_api_qwen("prompt", temperature=0.6)[0] == "second"
+    assert fake_client.calls == 2
+
+
+def test_use_cache_false_bypasses_the_cache(fake_client):
+    api_utils.call_api_qwen("prompt", temperature=0)
+    assert api_utils.call_api_qwen("prompt", temperature=0, use_cache=False)[0] == "second"
+    assert fake_client.calls == 2
+
+
+def test_response_failing_validation_is_not_cached(fake_client):
+    def is_valid(text):
+        return text != "first"
+
+    assert api_utils.call_api_qwen("prompt", temperature=0, validate=is_valid)[0] == "first"
+    # The invalid answer was not stored, so the retry reaches the model again
+    assert api_utils.call_api_qwen("prompt", temperature=0, validate=is_valid) == ("second", 12, 3)
+    assert api_utils.call_api_qwen("prompt", temperature=0, validate=is_valid) == ("second", 0, 0)
+    assert fake_client.calls == 2
+
+
+def test_cached_response_failing_validation_is_a_miss(fake_client):
+    api_utils.call_api_qwen("prompt", temperature=0)
+
+    assert api_utils.call_api_qwen("prompt", temperature=0, validate=lambda text: text != "first")[0] == "second"
+    assert fake_client.calls == 2
+
+
+def _cached_keys():
+    return {row[0] for row in llm_cache._conn.execute("SELECT key FROM cache")}
+
+
+def test_least_recently_used_entries_are_evicted(fake_client, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_ENTRIES", 2)
+    first, second, third = (llm_cache.make_key(prompt, "m", 0) for prompt in ("a", "b", "c"))
+
+    llm_cache.put(first, "A")
+    llm_cache.put(second, "B")
+    # Reading the first entry makes the second the least recently used
+    assert llm_cache.get(first) == "A"
+    llm_cache.put(third, "C")
+    assert _cached_keys() == {first, third}
+
+    # Replacing an existing entry does not push anything out
+    llm_cache.put(first, "A2")
+    assert _cached_keys() == {first, third}
+    assert llm_cache.get(first) == "A2"
+
+
+def test_cache_from_before_the_bound_is_upgraded_and_trimmed(fake_client, monkeypatch):
+    conn = sqlite3.connect(llm_cache.LLM_CACHE_PATH)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    conn.executemany("INSERT INTO cache VALUES (?, ?)", [(f"k{i}", f"r{i}") for i in range(5)])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_ENTRIES", 3)
+
+    assert llm_cache.get("missing") is None
+    assert len(_cached_keys()) == 3
+    llm_cache.put("new", "R")
+    assert "new" in _cached_keys() and len(_cached_keys()) == 3
@@ -0,0 +1,202 @@
+"""
+Tests for the multi-hop runner's pipelined entity ID numbering.
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from api import pipeline_runner_multi_hop as runner
+from api.models import TaskStatus, TaskType
+from api.pipeline_runner_multi_hop import _settled_prefix_numberer
+from api.task_manager import task_manager
+from src.components.add_entity_id import AddEntityId
+
+
+@pytest.fixture(autouse=True)
+def _add_entity_id_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("ADD_ENTITY_ID_INPUT_PATH", str(tmp_path / "input.json"))
+    monkeypatch.setenv("ADD_ENTITY_ID_OUTPUT_PATH", str(tmp_path / "output.json"))
+
+
+def _extracted(i, n_entities):
+    """What EntityExtractor adds to input i"""
+    names = [f"E{i}-{j}" for j in range(n_entities)]
+    return {
+        "entity": [{"entity_name": name, "entity_description": "d"} for name in names],
+        "relationship": [{"source_entity_name": names[0], "target_entity_name": names[-1]}],
+    }
+
+
+def test_ids_are_contiguous_when_results_arrive_out_of_order():
+    sizes = [2, 3, 1, 4, 2]
+    data = [{"id": i} for i in range(len(sizes))]
+    # Input 3 was extracted by an earlier run, so the extractor skips it
+    data[3].update(_extracted(3, sizes[3]))
+    expected = copy.deepcopy(data)
+    for i, size in enumerate(sizes):
+        if i != 3:
+            expected[i].update(_extracted(i, size))
+    # Numbering everything in input order is what the sequential AddEntityId stage did
+    reference = AddEntityId()
+    for cur_input in expected:
+        reference.add_ids(cur_input)
+
+    add_entity_id = AddEntityId()
+    number_settled_prefix = _settled_prefix_numberer(data, add_entity_id)
+
+    for i in [2, 4, 0]:
+        data[i].update(_extracted(i, sizes[i]))
+        number_settled_prefix(i)
+    # Only input 0 is a finished prefix; 2, 3 and 4 wait for input 1
+    assert "entity_id" in data[0]["entity"][0]
+    assert all("entity_id" not in entity for cur_input in data[2:] for entity in cur_input["entity"])
+
+    data[1].update(_extracted(1, sizes[1]))
+    number_settled_prefix(1)
+    number_settled_prefix()
+
+    ids = [entity["entity_id"] for cur_input in data for entity in cur_input["entity"]]
+    assert ids == list(range(sum(sizes)))
+    assert data == expected
+    assert add_entity_id.processed_count == len(data)
+
+
+def test_final_call_numbers_trailing_skipped_inputs():
+    data = [{"id": 0}, {"id": 1, **_extracted(1, 2)}, {"id": 2, **_extracted(2, 1)}]
+    add_entity_id = AddEntityId()
+    number_settled_prefix = _settled_prefix_numberer(data, add_entity_id)
+
+    data[0].update(_extracted(0, 1))
+    number_settled_prefix(0)
+    number_settled_prefix()
+
+    assert [entity["entity_id"] for cur_input in data for entity in cur_input["entity"]] == [0, 1, 2, 3]
+    assert data[1]["relationship"][0]["target_entity_id"] == 2
+
+
+class _FakeStage:
+    """Stands in for an LLM-bound component; run() passes its inputs through"""
+
+    def __init__(self, config=None, progress=None, cancel_event=None):
+        pass
+
+
+class _FakeEvaluator(_FakeStage):
+    """Scores one of two items, then waits until told to finish or stop"""
+
+    def __init__(self, config=None, progress=None, cancel_event=None):
+        self.progress = progress
+        self.stop_event = threading.Event()
+        self.scored_one = threading.Event()
+        self.finish = threading.Event()
+        self.stopped = False
+        _FakeEvaluator.instance = self
+
+    def run(self, inputs):
+        self.progress.set_total(2)
+        self.progress.increment()
+        self.scored_one.set()
+        while not self.finish.wait(0.01):
+            if self.stop_event.is_set():
+                self.stopped = True
+                break
+        return inputs, 1, 2, 0, 0
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch, tmp_path):
+    """Replace every component so only the runner's stage bookkeeping is exercised"""
+    preprocessor = SimpleNamespace(run=lambda: (0, 0, 1, 1), last_chunk_contents=[{"id": 0}])
+    monkeypatch.setattr(runner, "Preprocessor", lambda config=None: preprocessor)
+    monkeypatch.setattr(runner, "EntityExtractor", type("EntityExtractor", (_FakeStage,), {
+        "run": lambda self, inputs, on_result: (inputs, 0, 0, 1.0, 0, 0)}))
+    monkeypatch.setattr(runner, "EntityEliminator", type("EntityEliminator", (_FakeStage,), {
+        "run": lambda self, inputs: (inputs, {}, 0, 0, 0, 0)}))
+    monkeypatch.setattr(runner, "ProposeGenerator", type("ProposeGenerator", (_FakeStage,), {
+        "run": lambda self, inputs: (inputs, 0, 0, 0, 0, 0)}))
+    monkeypatch.setattr(runner, "QuestionExtractor", type("QuestionExtractor", (_FakeStage,), {
+        "run": lambda self, inputs: ([], 0)}))
+    monkeypatch.setattr(runner, "AnswerEvaluator", _FakeEvaluator)
+    monkeypatch.setattr(runner, "_RUNS_DIR", str(tmp_path))
+
+    task_id = task_manager.create_task(TaskType.MULTI_HOP)
+    yield task_id
+    task_manager.delete_task(task_id)
+
+
+def _final_answer_generator(body):
+    """A FinalAnswerGenerator whose run() calls body(inputs) once the evaluator has scored an item"""
+    def run(self, inputs):
+        assert _FakeEvaluator.instance.scored_one.wait(5)
+        return body(inputs)
+    return type("FinalAnswerGenerator", (_FakeStage,), {"run": run})
+
+
+def _wait_for_stage(task_id, stage_name, items_processed):
+    for _ in range(500):
+        stage = task_manager.get_task(task_id)["stages"].get(stage_name)
+        if stage and stage["items_processed"] == items_processed:
+            return stage
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{stage_name} never reported {items_processed} items")
+
+
+def test_overlapped_evaluator_reports_live_progress(fake_pipeline, monkeypatch):
+    task_id = fake_pipeline
+    seen = {}
+
+    def body(inputs):
+        # Polled while FinalAnswerGenerator is still running
+        seen["stage"] = _wait_for_stage(task_id, "answer_evaluator", 1)
+        _FakeEvaluator.instance.finish.set()
+        return inputs, 0, 0, 1, 1
+
+    monkeypatch.setattr(runner, "FinalAnswerGenerator", _final_answer_generator(body))
+    runner.run_multi_hop_pipeline_with_tracking(task_id)
+
+    assert seen["stage"]["status"] == TaskStatus.RUNNING.value
+    assert seen["stage"]["progress"] == 0.5
+    task = task_manager.get_task(task_id)
+    assert task["status"] == TaskStatus.COMPLETED.value
+    assert task["stages"]["answer_evaluator"]["status"] == TaskStatus.COMPLETED.value
+
+
+def test_final_answer_failure_stops_and_fails_the_evaluator(fake_pipeline, monkeypatch):
+    task_id = fake_pipeline
+
+    def body(inputs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(runner, "FinalAnswerGenerator", _final_answer_generator(body))
+    runner.run_multi_hop_pipeline_with_tracking(task_id)
+
+    assert _FakeEvaluator.instance.stopped
+    task = task_manager.get_task(task_id)
+    assert task["status"] == TaskStatus.FAILED.value
+    assert task["stages"]["final_answer_generator"]["status"] == TaskStatus.FAILED.value
+    assert task["stages"]["answer_evaluator"]["status"] == TaskStatus.FAILED.value
+
+
+def test_cancel_during_overlap_cancels_both_stages(fake_pipeline, monkeypatch):
+    task_id = fake_pipeline
+
+    def body(inputs):
+        task_manager.request_cancel(task_id)
+        raise runner.CancelledError()
+
+    monkeypatch.setattr(runner, "FinalAnswerGenerator", _final_answer_generator(body))
+    runner.run_multi_hop_pipeline_with_tracking(task_id)
+
+    assert _FakeEvaluator.instance.stopped
+    task = task_manager.get_task(task_id)
+    assert task["status"] == TaskStatus.CANCELLED.value
+    assert task["stages"]["final_answer_generator"]["status"] == TaskStatus.CANCELLED.value
+    assert task["stages"]["answer_evaluator"]["status"] == TaskStatus.CANCELLED.value
@@ -0,0 +1,71 @@
+"""
+Tests for TaskManager result storage: LRU eviction of result data and reload from disk.
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import task_manager as task_manager_module
+from api.models import TaskType
+from api.task_manager import TaskManager
+from src.utils.file_utils import save_json
+
+
+def _store_saved_result(manager, tmp_path, name):
+    """Create a task whose result data is also saved to files, as the runners do"""
+    task_id = manager.create_task(TaskType.MULTI_HOP)
+    data = [{"id": name, "text": "café", "entity": [{"entity_id": 1}]}]
+    extracted_questions = [{"question": f"What is {name}?", "answer": name}]
+    full_output_path = str(tmp_path / f"{name}_full.json")
+    extracted_output_path = str(tmp_path / f"{name}_questions.json")
+    save_json(data, full_output_path)
+    save_json(extracted_questions, extracted_output_path)
+    result = {
+        "total_chunks": 1,
+        "data": data,
+        "extracted_questions": extracted_questions,
+        "full_output_path": full_output_path,
+        "extracted_output_path": extracted_output_path,
+    }
+    manager.store_result(task_id, result)
+    return task_id, dict(result)
+
+
+def test_evicted_result_reloads_identically(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_manager_module, "RESULT_CACHE_MAX_ENTRIES", 1)
+    manager = TaskManager()
+
+    first_id, first_result = _store_saved_result(manager, tmp_path, "first")
+    second_id, _ = _store_saved_result(manager, tmp_path, "second")
+
+    # Storing the second result evicts the first one's bulky data, but keeps its summary
+    assert "data" not in manager.results[first_id]
+    assert manager.get_result(first_id, with_data=False)["total_chunks"] == 1
+
+    assert manager.get_result(first_id) == first_result
+    # Reloading made the first result the most recently used, so the second was evicted
+    assert "data" not in manager.results[second_id]
+
+
+def test_result_without_files_is_never_evicted(monkeypatch):
+    monkeypatch.setattr(task_manager_module, "RESULT_CACHE_MAX_ENTRIES", 1)
+    manager = TaskManager()
+
+    first_id = manager.create_task(TaskType.SINGLE_HOP)
+    manager.store_result(first_id, {"data": [1, 2, 3], "extracted_questions": []})
+    manager.store_result(manager.create_task(TaskType.SINGLE_HOP), {"data": [], "extracted_questions": []})
+
+    assert manager.get_result(first_id)["data"] == [1, 2, 3]
+
+
+def test_missing_files_after_eviction_return_none(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_manager_module, "RESULT_CACHE_MAX_ENTRIES", 1)
+    manager = TaskManager()
+
+    first_id, first_result = _store_saved_result(manager, tmp_path, "first")
+    _store_saved_result(manager, tmp_path, "second")
+    os.remove(first_result["full_output_path"])
+
+    assert manager.get_result(first_id) is None
@@ -0,0 +1,130 @@
+"""
+Tests for the task router: ETag / 304 status polling and the streamed result body.
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models import TaskStatus, TaskType
+from api.task_manager import task_manager
+
+client = TestClient(app)
+
+
+def test_status_poll_with_matching_etag_gets_304():
+    task_id = task_manager.create_task(TaskType.SINGLE_HOP)
+    try:
+        response = client.get(f"/tasks/{task_id}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        not_modified = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+        # Any change to the task gives it a new ETag and a full response again
+        task_manager.begin_stage(task_id, "preprocessor")
+        changed = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["stages"]["preprocessor"]["status"] == "running"
+    finally:
+        task_manager.delete_task(task_id)
+
+
+def test_status_poll_with_stale_etag_gets_full_response():
+    task_id = task_manager.create_task(TaskType.SINGLE_HOP)
+    try:
+        response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": '"stale", W/"other"'})
+        assert response.status_code == 200
+        assert response.json()["task_id"] == task_id
+    finally:
+        task_manager.delete_task(task_id)
+
+
+def test_streamed_result_is_valid_json():
+    task_id = task_manager.create_task(TaskType.MULTI_HOP)
+    # Enough items to span several stream chunks, with non-ASCII text
+    data = [{"id": i, "text": f"café {i} " + "x" * 200} for i in range(1000)]
+    extracted_questions = [{"question": f"Q{i}?", "answer": "答"} for i in range(50)]
+    try:
+        task_manager.store_result(task_id, {
+            "total_chunks": len(data),
+            "total_entities": 7,
+            "total_questions_generated": 60,
+            "total_valid_questions_extracted": len(extracted_questions),
+            "total_prompt_tokens": 10,
+            "total_completion_tokens": 5,
+            "data": data,
+            "extracted_questions": extracted_questions,
+        })
+        task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+
+        response = client.get(f"/tasks/{task_id}/result")
+        assert response.status_code == 200
+        assert json.loads(response.content) == {
+            "task_id": task_id,
+            "status": "completed",
+            "total_chunks": len(data),
+            "total_facts": 7,
+            "total_questions_generated": 60,
+            "total_valid_questions_extracted": len(extracted_questions),
+            "total_prompt_tokens": 10,
+            "total_completion_tokens": 5,
+            "results": data,
+            "extracted_questions": extracted_questions,
+        }
+    finally:
+        task_manager.delete_task(task_id)
+
+
+def test_streamed_result_with_empty_collections():
+    task_id = task_manager.create_task(TaskType.SINGLE_HOP)
+    try:
+        task_manager.store_result(task_id, {
+            "total_chunks": 0,
+            "total_facts": 0,
+            "total_questions_generated": 0,
+            "total_valid_questions_extracted": 0,
+            "total_prompt_tokens": 0,
+            "total_completion_tokens": 0,
+            "data": [],
+            "extracted_questions": [],
+        })
+        task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+
+        body = client.get(f"/tasks/{task_id}/result").json()
+        assert body["results"] == [] and body["extracted_questions"] == []
+    finally:
+        task_manager.delete_task(task_id)
+
+
+def test_streamed_result_with_int_keyed_dict():
+    task_id = task_manager.create_task(TaskType.MULTI_HOP)
+    # Entity-graph mode yields a dict keyed by int entity ids
+    data = {3: {"proposed-questions": {}}, 11: {"proposed-questions": {"type-1": {"question": "Q?"}}}}
+    try:
+        task_manager.store_result(task_id, {
+            "total_chunks": 2,
+            "total_entities": 2,
+            "total_questions_generated": 1,
+            "total_valid_questions_extracted": 0,
+            "total_prompt_tokens": 0,
+            "total_completion_tokens": 0,
+            "data": data,
+            "extracted_questions": [],
+        })
+        task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+
+        body = client.get(f"/tasks/{task_id}/result").json()
+        assert body["results"] == {str(key): value for key, value in data.items()}
+    finally:
+        task_manager.delete_task(task_id)
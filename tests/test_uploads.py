@@ -0,0 +1,61 @@
+"""
+Tests for the upload size limit: the up-front Content-Length check and the on-disk limit.
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from api import uploads
+from api.uploads import UploadSizeLimitMiddleware, save_upload
+
+
+def _recording_app():
+    """ASGI app that records the paths whose request reached it"""
+    reached = []
+
+    async def app(scope, receive, send):
+        reached.append(scope["path"])
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    return app, reached
+
+
+def test_oversize_declared_body_is_rejected_before_the_app(monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1024)
+    monkeypatch.setattr(uploads, "_MULTIPART_OVERHEAD", 0)
+    app, reached = _recording_app()
+    client = TestClient(UploadSizeLimitMiddleware(app, paths=["/multi-hop/run"]))
+
+    response = client.post("/multi-hop/run", files={"file": ("big.pdf", b"x" * 4096)})
+    assert response.status_code == 413
+    assert "1024 bytes" in response.json()["detail"]
+    assert reached == []
+
+    # Small uploads and other routes are passed through
+    assert client.post("/multi-hop/run", files={"file": ("small.pdf", b"x" * 100)}).status_code == 200
+    assert client.post("/config/", content=b"x" * 4096).status_code == 200
+    assert reached == ["/multi-hop/run", "/config/"]
+
+
+def test_save_upload_limits_what_is_written(monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 10)
+    monkeypatch.setattr(uploads, "_UPLOAD_CHUNK_SIZE", 4)
+    dest = tmp_path / "upload.pdf"
+
+    asyncio.run(save_upload(UploadFile(io.BytesIO(b"x" * 10), filename="ok.pdf"), dest))
+    assert dest.read_bytes() == b"x" * 10
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(save_upload(UploadFile(io.BytesIO(b"x" * 11), filename="big.pdf"), dest))
+    assert exc_info.value.status_code == 413
+    assert not dest.exists()